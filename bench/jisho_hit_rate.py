@@ -0,0 +1,112 @@
+"""Jisho cache hit rate of the katakana workflow on a recorded query log.
+
+Replays bench/fixtures/jisho-queries.jsonl (one JSON string per line, as
+typed, including case and whitespace variants and plurals) through the
+Script Filter against the Jisho stub. After each query it waits for the
+background lookup and reruns the query once, the way Alfred's rerun would.
+Only the first run of each query counts. A hit is a first run that finds a
+cached result, so it needs no Jisho request.
+
+--no-normalize swaps the sandbox's normalize.py for a pass-through one, so
+every query is its own cache key with no aliases or plural lookups, as
+before normalisation was added. That reproduces the "before" figure.
+
+Usage: python3 bench/jisho_hit_rate.py [QUERY_LOG] [--min-hit-rate R] [--no-normalize]
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+
+from jisho_stub import JishoStub
+from sandbox import FIXTURES, Sandbox
+
+DEFAULT_LOG = os.path.join(FIXTURES, 'jisho-queries.jsonl')
+
+PASS_THROUGH_NORMALIZE = '''"""Pass-through normalize.py written by jisho_hit_rate.py --no-normalize"""
+
+
+def normalize(query):
+    return query
+
+
+def plural_lemmas(text):
+    return []
+
+
+def load_aliases(data_dir):
+    return {}
+
+
+def save_alias(data_dir, variant, canonical):
+    pass
+'''
+
+
+def last_metrics(sandbox):
+    with open(os.path.join(sandbox.data_dir, 'metrics.jsonl'), 'r') as f:
+        return json.loads(f.readlines()[-1])
+
+
+def replay(queries, stub, normalize=True):
+    hits, misses, unresolved = 0, [], []
+    with Sandbox('katakana') as sandbox:
+        if not normalize:
+            with open(os.path.join(sandbox.workflow_dir, 'normalize.py'), 'w') as f:
+                f.write(PASS_THROUGH_NORMALIZE)
+        for query in queries:
+            sandbox.run([query], JISHO_API_URL=stub.url, WORKFLOW_METRICS=1)
+            if last_metrics(sandbox)['tags'].get('cache') == 'hit':
+                hits += 1
+                continue
+            misses.append(query)
+            sandbox.wait_for_background()
+            _, stdout, _ = sandbox.run([query], JISHO_API_URL=stub.url)
+            if 'Offline guess' in stdout:
+                unresolved.append(query)
+
+        entries = [path for path in glob.glob(os.path.join(sandbox.data_dir, '*.json'))
+                   if os.path.basename(path) not in ('aliases.json',)]
+        return {
+            'queries': len(queries),
+            'hits': hits,
+            'hit_rate': hits / len(queries) if queries else 0.0,
+            'jisho_requests': len(stub.requests),
+            'cache_entries': len(entries),
+            'misses': misses,
+            'unresolved': sorted(set(unresolved)),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('log', nargs='?', default=DEFAULT_LOG)
+    parser.add_argument('--min-hit-rate', type=float, default=0.0)
+    parser.add_argument('--verbose', action='store_true', help='list every miss')
+    parser.add_argument('--no-normalize', dest='normalize', action='store_false',
+                        help='use every query as typed as its cache key, no aliases or plurals')
+    options = parser.parse_args()
+
+    with open(options.log, 'r', encoding='utf-8') as f:
+        queries = [json.loads(line) for line in f if line.strip()]
+
+    with JishoStub() as stub:
+        result = replay(queries, stub, options.normalize)
+
+    print(f"queries         {result['queries']}")
+    print(f"cache hits      {result['hits']} ({result['hit_rate']:.1%})")
+    print(f"jisho requests  {result['jisho_requests']}")
+    print(f"cache entries   {result['cache_entries']}")
+    print(f"unresolved      {len(result['unresolved'])} {result['unresolved']}")
+    if options.verbose:
+        print(f"misses          {result['misses']}")
+
+    if result['hit_rate'] < options.min_hit_rate:
+        print(f"FAIL hit rate {result['hit_rate']:.1%} below {options.min_hit_rate:.1%}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
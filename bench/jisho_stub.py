@@ -0,0 +1,67 @@
+"""Local HTTP stub for the Jisho search API.
+
+Serves bench/fixtures/jisho/<keyword>.json for page 1. Other keywords get the
+entries of bench/fixtures/jisho-cache/loanwords.json that list the keyword as
+a definition. Like Jisho, the stub ignores case, but it does no stemming, so
+a plural gets an empty result. So does every page after the first. Point
+the katakana workflow at it with JISHO_API_URL=<stub.url>.
+"""
+import json
+import os
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from sandbox import FIXTURES
+
+
+class JishoStub:
+    def __init__(self, fixtures=FIXTURES, delay=0.0):
+        self.fixtures = fixtures
+        self.delay = delay
+        self.requests = []
+        self.entries = {}
+        with open(os.path.join(fixtures, 'jisho-cache', 'loanwords.json'), 'r', encoding='utf-8') as f:
+            for entry in json.load(f):
+                for definition in entry['senses'][0]['english_definitions']:
+                    self.entries.setdefault(definition.lower(), []).append(entry)
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                query = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query)
+                keyword = query.get('keyword', [''])[0]
+                page = int(query.get('page', ['1'])[0])
+                stub.requests.append((keyword, page))
+                time.sleep(stub.delay)
+
+                body = {"meta": {"status": 200}, "data": []}
+                path = os.path.join(stub.fixtures, 'jisho', f"{keyword.lower()}.json")
+                if page == 1 and os.path.exists(path):
+                    with open(path, 'r', encoding='utf-8') as f:
+                        body = json.load(f)
+                elif page == 1:
+                    body["data"] = stub.entries.get(keyword.lower(), [])
+
+                payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/api/v1/search/words"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,111 @@
+"""Accuracy and latency of the offline katakana transliteration.
+
+Collects (English word, katakana reading) pairs from Jisho results, i.e.
+entries whose reading is pure katakana with no kanji spelling and whose
+definition is a single word, and compares them with translit.transliterate().
+Sources are the recorded stub responses, bench/fixtures/jisho-cache and any
+extra directories or files given, such as the workflow's own cache.
+Words listed in pronunciations.txt are reported separately from words that
+go through the spelling rules.
+
+Usage: python3 bench/katakana_accuracy.py [CACHE_DIR_OR_FILE ...] [--min-accuracy 0.6] [--budget-ms 3]
+"""
+import argparse
+import difflib
+import glob
+import json
+import os
+import re
+import sys
+import time
+
+from sandbox import FIXTURES, ROOT
+
+sys.path.insert(0, os.path.join(ROOT, 'workflow-katakana'))
+
+KATAKANA = re.compile(r'^[ァ-ヺー]+$')
+
+
+def json_files(paths):
+    files = []
+    for path in paths:
+        files.extend(sorted(glob.glob(os.path.join(path, '*.json'))) if os.path.isdir(path) else [path])
+    return files
+
+
+def reference_pairs(paths):
+    """{english: set(readings)} from Jisho responses or cached result lists"""
+    pairs = {}
+    for path in json_files(paths):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        entries = data.get('data', []) if isinstance(data, dict) else data
+        for entry in entries if isinstance(entries, list) else []:
+            japanese = (entry.get('japanese') or [{}])[0]
+            reading = japanese.get('reading') or ''
+            if japanese.get('word') or not KATAKANA.match(reading):
+                continue
+            for definition in (entry.get('senses') or [{}])[0].get('english_definitions', []):
+                if re.fullmatch(r'[A-Za-z]+', definition):
+                    pairs.setdefault(definition.lower(), set()).add(reading)
+    return pairs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('paths', nargs='*')
+    parser.add_argument('--min-accuracy', type=float, default=0.6, help='exact-match rate required for rule-based words')
+    parser.add_argument('--budget-ms', type=float, default=3.0, help='p95 latency budget per word, including the table load')
+    parser.add_argument('--verbose', action='store_true', help='print every mismatch')
+    options = parser.parse_args()
+
+    sources = [os.path.join(FIXTURES, 'jisho'), os.path.join(FIXTURES, 'jisho-cache')] + options.paths
+    pairs = reference_pairs(sources)
+    if not pairs:
+        print("No katakana pairs found", file=sys.stderr)
+        return 1
+
+    import translit
+    started = time.perf_counter()
+    translit.load_pronunciations()
+    load_ms = (time.perf_counter() - started) * 1000
+    table = translit.load_pronunciations()
+
+    results = {'table': [], 'rules': []}
+    latencies = []
+    for word, readings in sorted(pairs.items()):
+        started = time.perf_counter()
+        guess = translit.transliterate(word)
+        latencies.append((time.perf_counter() - started) * 1000)
+        similarity = max(difflib.SequenceMatcher(None, guess, reading).ratio() for reading in readings)
+        results['table' if word in table else 'rules'].append((word, guess, readings, similarity))
+        if options.verbose and guess not in readings:
+            print(f"  {word:<16} {guess:<16} expected {' / '.join(sorted(readings))}")
+
+    failures = []
+    for source, rows in results.items():
+        if not rows:
+            continue
+        exact = sum(1 for _, guess, readings, _ in rows if guess in readings) / len(rows)
+        similarity = sum(row[3] for row in rows) / len(rows)
+        print(f"{source:<6} words {len(rows):4d}  exact {exact:6.1%}  similarity {similarity:6.1%}")
+        if source == 'rules' and exact < options.min_accuracy:
+            failures.append(f"rule-based exact match {exact:.1%} is below {options.min_accuracy:.1%}")
+
+    latencies.sort()
+    p95 = latencies[max(0, -(-len(latencies) * 95 // 100) - 1)] + load_ms
+    print(f"latency p50 {latencies[len(latencies) // 2]:.3f} ms  p95 {latencies[-(-len(latencies) * 95 // 100) - 1]:.3f} ms  "
+          f"max {latencies[-1]:.3f} ms  table load {load_ms:.2f} ms")
+    if p95 > options.budget_ms:
+        failures.append(f"first word would take {p95:.2f} ms at p95 (budget {options.budget_ms:.1f} ms)")
+
+    for failure in failures:
+        print(f"FAIL {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,178 @@
+"""Keystroke latency benchmarks for the workflow Script Filters.
+
+Every scenario replays a query sequence through one workflow's Script Filter
+in a sandbox: recorded or synthetic `aws`/`acli`/`gh` output comes from bench/fakebin,
+Jisho responses from a local HTTP stub. The cold phase starts each pass with
+an empty data directory, the warm phase reruns the sequence on the populated
+cache. Results are printed and written as JSON for later comparison.
+
+Usage:
+    python3 bench/run.py [--scenario NAME ...] [--warm-repeat N] [--cli-delay S] [--output FILE]
+    python3 bench/run.py --compare BASE.json HEAD.json
+"""
+import argparse
+import datetime
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+
+from jisho_stub import JishoStub
+from sandbox import BENCH_DIR, FIXTURES, ROOT, Sandbox
+from synth import write_fixtures
+
+
+def typeahead(text):
+    """每次按键产生的查询序列"""
+    return [text[:i] for i in range(1, len(text) + 1)]
+
+
+# name: (workflow, queries, fixture set)
+SCENARIOS = {
+    'awscli-ec2-typeahead': ('awscli', typeahead('ec2 prod web-server'), 'recorded'),
+    'acli-me-bug': ('acli', typeahead('me bug'), 'recorded'),
+    'katakana-words': ('katakana', ['computer', 'coffee', 'television', 'internet'], 'recorded'),
+    'awscli-ec2-10k': ('awscli', typeahead('ec2 prod web-server'), 'synthetic'),
+    'awscli-lambda-5k': ('awscli', typeahead('lambda prod payments'), 'synthetic'),
+    'acli-20k-all': ('acli', ['--all', 'me --all', 'bug --all', 'me bug --all'], 'synthetic'),
+    'gh-repos-typeahead': ('gh', typeahead('payments'), 'recorded'),
+    'gh-repos-5k': ('gh', typeahead('payments'), 'synthetic'),
+}
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile"""
+    ordered = sorted(samples)
+    index = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+def summarize(samples_ms):
+    return {
+        'count': len(samples_ms),
+        'p50': round(percentile(samples_ms, 50), 2),
+        'p95': round(percentile(samples_ms, 95), 2),
+        'p99': round(percentile(samples_ms, 99), 2),
+        'max': round(max(samples_ms), 2),
+    }
+
+
+def run_sequence(sandbox, queries, env):
+    samples = []
+    for query in queries:
+        elapsed, _, _ = sandbox.run([query], **env)
+        samples.append(elapsed * 1000)
+    return samples
+
+
+def run_scenario(name, fixtures_dir, stub, options):
+    workflow, queries, _ = SCENARIOS[name]
+    env = {
+        'BENCH_FIXTURES': fixtures_dir,
+        'BENCH_AWS_DELAY': options.cli_delay,
+        'BENCH_ACLI_DELAY': options.cli_delay,
+        'BENCH_GH_DELAY': options.cli_delay,
+        'JISHO_API_URL': stub.url,
+    }
+    with Sandbox(workflow) as sandbox:
+        cold = []
+        for _ in range(options.cold_repeat):
+            sandbox.clear_data()
+            cold.extend(run_sequence(sandbox, queries, env))
+        sandbox.wait_for_background()
+        sandbox.reset_calls()
+
+        warm = []
+        for _ in range(options.warm_repeat):
+            warm.extend(run_sequence(sandbox, queries, env))
+
+        return {
+            'workflow': workflow,
+            'queries': queries,
+            'cold': summarize(cold),
+            'warm': summarize(warm),
+            'warm_cli_calls': len(sandbox.calls()),
+        }
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(base_path, head_path):
+    with open(base_path, 'r') as f:
+        base = json.load(f)['scenarios']
+    with open(head_path, 'r') as f:
+        head = json.load(f)['scenarios']
+
+    print(f"{'scenario':<24} {'phase':<5} {'p50':>18} {'p95':>18} {'p99':>18}")
+    for name in sorted(set(base) & set(head)):
+        for phase in ('cold', 'warm'):
+            cells = []
+            for pct in ('p50', 'p95', 'p99'):
+                old, new = base[name][phase][pct], head[name][phase][pct]
+                change = (new - old) / old * 100 if old else 0.0
+                cells.append(f"{new:8.1f} ({change:+5.1f}%)")
+            print(f"{name:<24} {phase:<5} {' '.join(cells)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS),
+                        help='scenario to run, repeatable (default: all)')
+    parser.add_argument('--cold-repeat', type=int, default=2)
+    parser.add_argument('--warm-repeat', type=int, default=5)
+    parser.add_argument('--cli-delay', type=float, default=0.0,
+                        help='seconds the fake CLIs and the Jisho stub wait per call')
+    parser.add_argument('--output', help='result file (default: bench/results/<timestamp>.json)')
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'HEAD'))
+    options = parser.parse_args()
+
+    if options.compare:
+        compare(*options.compare)
+        return 0
+
+    names = options.scenario or list(SCENARIOS)
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='bench-synth-') as synth_dir, \
+            JishoStub(delay=options.cli_delay) as stub:
+        if any(SCENARIOS[name][2] == 'synthetic' for name in names):
+            write_fixtures(synth_dir)
+
+        print(f"{'scenario':<24} {'phase':<5} {'p50':>8} {'p95':>8} {'p99':>8}  (ms)")
+        for name in names:
+            fixtures_dir = synth_dir if SCENARIOS[name][2] == 'synthetic' else FIXTURES
+            result = results[name] = run_scenario(name, fixtures_dir, stub, options)
+            for phase in ('cold', 'warm'):
+                stats = result[phase]
+                print(f"{name:<24} {phase:<5} {stats['p50']:8.1f} {stats['p95']:8.1f} {stats['p99']:8.1f}")
+
+    report = {
+        'meta': {
+            'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cold_repeat': options.cold_repeat,
+            'warm_repeat': options.warm_repeat,
+            'cli_delay': options.cli_delay,
+        },
+        'scenarios': results,
+    }
+    output = options.output or os.path.join(
+        BENCH_DIR, 'results', f"{datetime.datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved {output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""Isolated copies of the workflows for benchmarks and startup checks.
+
+A sandbox copies `common/` and one workflow's scripts into a temporary
+tree, points `alfred_workflow_data` at a private data directory and puts
+bench/fakebin first on PATH, so runs never touch real caches or real AWS/Jira.
+"""
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+FAKEBIN = os.path.join(BENCH_DIR, 'fakebin')
+FIXTURES = os.path.join(BENCH_DIR, 'fixtures')
+
+ACLI_ENV = """JIRA_BASE_URL=https://bench.atlassian.net
+JIRA_USERNAME=bench@example.com
+JIRA_PROJECT=DBRE
+JIRA_TYPE=
+"""
+
+# Workflows whose Script Filter is not main.py
+SCRIPT_FILTERS = {
+    'gh': ['bash', 'gh.sh'],
+}
+
+
+class Sandbox:
+    def __init__(self, workflow, env_file=None):
+        self.workflow = workflow
+        self.dir = tempfile.mkdtemp(prefix=f"bench-{workflow}-")
+        shutil.copytree(os.path.join(ROOT, 'common'), os.path.join(self.dir, 'common'),
+                        ignore=shutil.ignore_patterns('__pycache__'))
+
+        source = os.path.join(ROOT, f"workflow-{workflow}")
+        self.workflow_dir = os.path.join(self.dir, f"workflow-{workflow}")
+        shutil.copytree(source, self.workflow_dir,
+                        ignore=shutil.ignore_patterns('__pycache__', '.env', '*.png', 'info.plist'))
+        if env_file is None and workflow == 'acli':
+            env_file = ACLI_ENV
+        if env_file:
+            with open(os.path.join(self.workflow_dir, '.env'), 'w') as f:
+                f.write(env_file)
+
+        self.data_dir = os.path.join(self.dir, 'data')
+        os.makedirs(self.data_dir)
+        self.call_log = os.path.join(self.dir, 'calls.log')
+
+    def env(self, **extra):
+        env = dict(os.environ)
+        env.update({
+            'alfred_workflow_data': self.data_dir,
+            'PATH': f"{FAKEBIN}{os.pathsep}{env.get('PATH', '')}",
+            'BENCH_CALL_LOG': self.call_log,
+            'BENCH_FIXTURES': FIXTURES,
+        })
+        env.update({k: str(v) for k, v in extra.items()})
+        return env
+
+    def run(self, args, python_flags=(), **env):
+        """Run the Script Filter once, returns (elapsed seconds, stdout, stderr)"""
+        command = SCRIPT_FILTERS.get(self.workflow, [sys.executable, *python_flags, 'main.py']) + list(args)
+        start = time.perf_counter()
+        result = subprocess.run(command, cwd=self.workflow_dir, env=self.env(**env),
+                                capture_output=True, text=True)
+        elapsed = time.perf_counter() - start
+        if result.returncode != 0:
+            raise RuntimeError(f"{self.workflow} {args!r} exited {result.returncode}: {result.stderr.strip()}")
+        return elapsed, result.stdout, result.stderr
+
+    def calls(self):
+        """Commands the fake executables received since the last reset"""
+        if not os.path.exists(self.call_log):
+            return []
+        with open(self.call_log, 'r') as f:
+            return [line.rstrip('\n') for line in f if line.strip()]
+
+    def reset_calls(self):
+        if os.path.exists(self.call_log):
+            os.remove(self.call_log)
+
+    def wait_for_background(self, timeout=120):
+        """Wait until background refreshes started by the Script Filter release their *.lock"""
+        import glob
+        deadline = time.monotonic() + timeout
+        while glob.glob(os.path.join(self.data_dir, '*.lock')) and time.monotonic() < deadline:
+            time.sleep(0.1)
+
+    def clear_data(self):
+        self.wait_for_background()
+        shutil.rmtree(self.data_dir)
+        os.makedirs(self.data_dir)
+
+    def cleanup(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cleanup()
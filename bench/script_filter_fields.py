@@ -0,0 +1,69 @@
+"""Check the Alfred-specific fields of each Script Filter's JSON output.
+
+`cache` must only appear where no query can change the result, because
+Alfred does not key its cache by query. `rerun` must appear while a
+background refresh is in flight and disappear once the data is in place.
+
+Usage: python3 bench/script_filter_fields.py
+"""
+import json
+import os
+import sys
+import time
+
+from jisho_stub import JishoStub
+from sandbox import Sandbox
+
+
+def fields(sandbox, args, **env):
+    _, stdout, _ = sandbox.run(args, **env)
+    response = json.loads(stdout)
+    return response.get('cache'), response.get('rerun')
+
+
+def check(failures, name, actual, expected):
+    status = 'ok' if actual == expected else 'FAIL'
+    print(f"{status:<4} {name}: cache={actual[0]} rerun={actual[1]}")
+    if actual != expected:
+        failures.append(f"{name}: expected cache={expected[0]} rerun={expected[1]}")
+
+
+def main():
+    failures = []
+
+    with Sandbox('awscli') as sandbox:
+        check(failures, 'awscli typed query', fields(sandbox, ['ec2 prod web']), (None, None))
+        check(failures, 'awscli global search, prefetch in flight',
+              fields(sandbox, ['* prod web'], BENCH_AWS_DELAY=1), (None, 0.5))
+        sandbox.wait_for_background()
+        time.sleep(1.5)
+        check(failures, 'awscli global search, all cached', fields(sandbox, ['* prod web']), (None, None))
+
+    with Sandbox('acli', env_file='JIRA_PROJECT=DBRE\n') as sandbox:
+        check(failures, 'acli configuration error', fields(sandbox, ['me bug']),
+              ({'seconds': 30, 'loosereload': True}, None))
+    with Sandbox('acli') as sandbox:
+        check(failures, 'acli typed query', fields(sandbox, ['me bug']), (None, None))
+        check(failures, 'acli --all, fetch in flight', fields(sandbox, ['me --all'], BENCH_ACLI_DELAY=1), (None, 1.0))
+        sandbox.wait_for_background()
+        check(failures, 'acli --all, all pages cached', fields(sandbox, ['me --all']), (None, None))
+
+    with Sandbox('slack') as sandbox:
+        check(failures, 'slack idle', fields(sandbox, [], query='dev'), (None, None))
+        with open(os.path.join(sandbox.data_dir, 'sync.lock'), 'w') as f:
+            f.write(str(os.getpid()))
+        check(failures, 'slack sync in flight', fields(sandbox, [], query='dev'), (None, 1.0))
+
+    with JishoStub(delay=0.5) as stub, Sandbox('katakana') as sandbox:
+        check(failures, 'katakana offline guess, lookup in flight',
+              fields(sandbox, ['computer'], JISHO_API_URL=stub.url), (None, 0.3))
+        sandbox.wait_for_background()
+        check(failures, 'katakana typed query', fields(sandbox, ['computer'], JISHO_API_URL=stub.url), (None, None))
+
+    for failure in failures:
+        print(f"FAIL {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,119 @@
+"""Local HTTP stub for the Slack Web API methods the slack workflow calls.
+
+Serves auth.test and conversations.list over `channels`, a list of channel
+dicts that a check can edit between syncs. conversations.list pages through
+it with opaque cursors, like Slack, and returns at most `page_size` channels
+per page whatever `limit` asks for, so a few hundred channels are enough to
+exercise pagination. Cursors from before the last expire_cursors() call, or
+ones the stub never issued, get ok:false with invalid_cursor, as Slack
+answers for an expired cursor. inject() replaces the response to the Nth
+conversations.list request with a canned one (an HTTP 429 with Retry-After,
+an ok:false body, a 500). Point the workflow at it with
+SLACK_API_URL=<stub.url>.
+"""
+import base64
+import json
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def make_channels(count, start=0):
+    return [{
+        'id': f"C{n:08d}",
+        'name': f"channel-{n:04d}",
+        'topic': {'value': f"topic {n}"},
+        'num_members': n % 97,
+    } for n in range(start, start + count)]
+
+
+def encode_cursor(offset, epoch=0):
+    return base64.b64encode(f"offset:{offset}:{epoch}".encode()).decode()
+
+
+def decode_cursor(cursor):
+    return int(base64.b64decode(cursor).decode().split(':')[1])
+
+
+def cursor_epoch(cursor):
+    try:
+        return int(base64.b64decode(cursor).decode().split(':')[2])
+    except (ValueError, IndexError):
+        return None
+
+
+class SlackStub:
+    def __init__(self, channels=(), page_size=200):
+        self.channels = list(channels)
+        self.page_size = page_size
+        self.requests = []
+        self.injected = {}
+        self.list_calls = 0
+        self.epoch = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urllib.parse.urlparse(self.path)
+                method = url.path.rsplit('/', 1)[-1]
+                params = {key: values[0] for key, values in urllib.parse.parse_qs(url.query).items()}
+                stub.requests.append((method, params, time.monotonic()))
+
+                status, headers, body = 200, {}, {'ok': False, 'error': 'unknown_method'}
+                if method == 'auth.test':
+                    body = {'ok': True, 'team_id': 'T0BENCH'}
+                elif method == 'conversations.list':
+                    stub.list_calls += 1
+                    if stub.list_calls in stub.injected:
+                        status, headers, body = stub.injected.pop(stub.list_calls)
+                    else:
+                        body = stub.page(params)
+
+                payload = json.dumps(body).encode('utf-8') if body is not None else b''
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/api"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def page(self, params):
+        if params.get('cursor') and cursor_epoch(params['cursor']) != self.epoch:
+            return {'ok': False, 'error': 'invalid_cursor'}
+        offset = decode_cursor(params['cursor']) if params.get('cursor') else 0
+        size = min(int(params.get('limit', 100)), self.page_size)
+        end = offset + size
+        next_cursor = encode_cursor(end, self.epoch) if end < len(self.channels) else ''
+        return {
+            'ok': True,
+            'channels': self.channels[offset:end],
+            'response_metadata': {'next_cursor': next_cursor},
+        }
+
+    def expire_cursors(self):
+        """Make every cursor handed out so far invalid"""
+        self.epoch += 1
+
+    def inject(self, call, status=200, headers=None, body=None):
+        """Answer the call-th conversations.list request (counted from 1 since start) with this response"""
+        self.injected[call] = (status, headers or {}, body)
+
+    def list_requests(self):
+        return [(params, at) for method, params, at in self.requests if method == 'conversations.list']
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,146 @@
+"""Check the slack workflow's channel sync against the Slack stub.
+
+Runs `main.py --sync` in a sandbox, with SLACK_API_URL pointed at
+bench/slack_stub.py, through a sequence of passes over one channel index:
+
+- a full sync follows conversations.list cursors across pages
+- a sync interrupted by a server error keeps what it fetched, persists
+  sync_cursor, deletes nothing and leaves sync.failed behind
+- the next sync resumes from that cursor and, once the pass completes,
+  removes the channels it did not see
+- a saved cursor that Slack rejects with invalid_cursor restarts the pass
+  from the first page instead of failing every later sync
+- an HTTP 429 is retried after its Retry-After delay
+- an ok:false response raises SlackAPIError and fails the sync
+
+Usage: python3 bench/slack_sync.py
+"""
+import os
+import sqlite3
+import subprocess
+import sys
+
+from sandbox import Sandbox
+from slack_stub import SlackStub, decode_cursor, make_channels
+
+SETTINGS = {'SLACK_TOKEN': 'xoxb-bench', 'SLACK_TEAM_ID': 'T0BENCH'}
+
+
+def sync(sandbox, stub):
+    """Run one sync, returns True if it succeeded"""
+    try:
+        sandbox.run(['--sync'], SLACK_API_URL=stub.url, **SETTINGS)
+        return True
+    except RuntimeError:
+        return False
+
+
+def index(sandbox):
+    conn = sqlite3.connect(os.path.join(sandbox.data_dir, 'channels.db'))
+    try:
+        ids = {row[0] for row in conn.execute("SELECT id FROM channels")}
+        meta = dict(conn.execute("SELECT key, value FROM meta").fetchall())
+    finally:
+        conn.close()
+    return ids, meta
+
+
+def cursors(requests):
+    return [decode_cursor(params['cursor']) if 'cursor' in params else 0 for params, _ in requests]
+
+
+def check(failures, name, condition, detail=''):
+    print(f"{'ok' if condition else 'FAIL':<4} {name}{f': {detail}' if detail else ''}")
+    if not condition:
+        failures.append(name)
+
+
+def main():
+    failures = []
+
+    with SlackStub(make_channels(450), page_size=200) as stub, Sandbox('slack') as sandbox:
+        failed_marker = os.path.join(sandbox.data_dir, 'sync.failed')
+
+        # 完整同步：三页
+        succeeded = sync(sandbox, stub)
+        ids, meta = index(sandbox)
+        offsets = cursors(stub.list_requests())
+        check(failures, 'full sync follows cursors', succeeded and offsets == [0, 200, 400], f"offsets {offsets}")
+        check(failures, 'full sync stores every channel', len(ids) == 450, f"{len(ids)} channels")
+        check(failures, 'full sync clears sync_cursor', 'sync_cursor' not in meta and 'last_sync' in meta)
+
+        # 50 个频道被删除，同步在第二页遇到 500 中断
+        removed = {channel['id'] for channel in stub.channels[:50]}
+        del stub.channels[:50]
+        stub.inject(stub.list_calls + 2, status=500)
+        succeeded = sync(sandbox, stub)
+        ids, meta = index(sandbox)
+        saved = decode_cursor(meta['sync_cursor']) if meta.get('sync_cursor') else None
+        check(failures, 'interrupted sync fails and leaves sync.failed', not succeeded and os.path.exists(failed_marker))
+        check(failures, 'interrupted sync persists sync_cursor', saved == 200, f"cursor offset {saved}")
+        check(failures, 'interrupted sync deletes nothing', removed <= ids and len(ids) == 450, f"{len(ids)} channels")
+
+        # 从保存的 cursor 继续，完整的一轮结束后删除没见到的频道
+        start = len(stub.list_requests())
+        succeeded = sync(sandbox, stub)
+        ids, meta = index(sandbox)
+        offsets = cursors(stub.list_requests()[start:])
+        check(failures, 'next sync resumes from sync_cursor', succeeded and offsets == [200], f"offsets {offsets}")
+        check(failures, 'completed pass removes unseen channels', not (removed & ids) and len(ids) == 400,
+              f"{len(ids)} channels, {len(removed & ids)} removed ones left")
+        check(failures, 'successful sync clears sync.failed', not os.path.exists(failed_marker))
+
+        # 中断后保存的 cursor 过期：从第一页重新开始，并且照常删除没见到的频道
+        stub.inject(stub.list_calls + 2, status=500)
+        sync(sandbox, stub)
+        removed = {channel['id'] for channel in stub.channels[:20]}
+        del stub.channels[:20]
+        stub.expire_cursors()
+        start = len(stub.list_requests())
+        succeeded = sync(sandbox, stub)
+        ids, meta = index(sandbox)
+        offsets = cursors(stub.list_requests()[start:])
+        check(failures, 'rejected sync_cursor restarts the pass', succeeded and offsets == [200, 0, 200],
+              f"offsets {offsets}")
+        check(failures, 'restarted pass removes unseen channels', not (removed & ids) and len(ids) == 380
+              and 'sync_cursor' not in meta and not os.path.exists(failed_marker), f"{len(ids)} channels")
+
+        # 429 + Retry-After
+        start = len(stub.list_requests())
+        stub.inject(stub.list_calls + 1, status=429, headers={'Retry-After': '1'}, body={'ok': False, 'error': 'ratelimited'})
+        succeeded = sync(sandbox, stub)
+        requests = stub.list_requests()[start:]
+        offsets = cursors(requests)
+        waited = requests[1][1] - requests[0][1] if len(requests) > 1 else 0
+        check(failures, '429 is retried after Retry-After',
+              succeeded and offsets == [0, 0, 200] and waited >= 1.0, f"offsets {offsets}, waited {waited:.2f}s")
+
+        # ok:false
+        stub.inject(stub.list_calls + 1, body={'ok': False, 'error': 'invalid_auth'})
+        succeeded = sync(sandbox, stub)
+        reason = ''
+        if os.path.exists(failed_marker):
+            with open(failed_marker, 'r') as f:
+                reason = f.read()
+        check(failures, 'ok:false fails the sync', not succeeded and reason == 'invalid_auth', f"sync.failed {reason!r}")
+
+        stub.inject(stub.list_calls + 1, body={'ok': False, 'error': 'invalid_auth'})
+        probe = (
+            "import main\n"
+            "try:\n"
+            "    main.slack_api('conversations.list', {}, main.load_settings())\n"
+            "except main.SlackAPIError as e:\n"
+            "    print(f'SlackAPIError {e}')\n"
+        )
+        result = subprocess.run([sys.executable, '-c', probe], cwd=sandbox.workflow_dir, capture_output=True, text=True,
+                                env=sandbox.env(SLACK_API_URL=stub.url, **SETTINGS))
+        check(failures, 'ok:false raises SlackAPIError', result.stdout.strip() == 'SlackAPIError invalid_auth',
+              result.stdout.strip() or result.stderr.strip().splitlines()[-1:])
+
+    for failure in failures:
+        print(f"FAIL {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
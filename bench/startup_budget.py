@@ -0,0 +1,123 @@
+"""Fail when a workflow's cached keystroke path imports more than its budget.
+
+Each case warms the sandbox cache once, then reruns the same query under
+`python -X importtime` and sums the self time of every module that is not in
+the baseline: what a bare interpreter loads plus BASELINE_IMPORTS, the
+stdlib modules the Script Filters have always imported at the top. Their
+cost varies by several milliseconds between runs and is not something a
+change to the workflows can win back, so it is left out rather than
+drowning the modules the budget is about. A case can add modules to its
+own baseline: the synced slack case opens the sqlite3 channel index, and
+sqlite3 (which pulls in datetime) costs 3-4 ms on its own, with the same
+run-to-run spread. That is the price of reading the index at all, not
+something the Script Filter can trim, so it is counted as baseline while
+everything the workflow imports on top of it stays within the budget.
+Runs use the bytecode cache, as Alfred does. A case fails only if its
+fastest run is over budget. The cached run must also not launch any fake
+`aws`/`acli` process or reach the Jisho or Slack stub.
+
+Usage: python3 bench/startup_budget.py [--runs N] [--budget-ms MS]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+from jisho_stub import JishoStub
+from sandbox import Sandbox
+from slack_stub import SlackStub, make_channels
+
+DEFAULT_BUDGET_MS = 5.0
+BASELINE_IMPORTS = ('json', 'hashlib', 'math', 're')
+
+SLACK_SETTINGS = {'SLACK_TOKEN': 'xoxb-bench', 'SLACK_TEAM_ID': 'T0BENCH'}
+
+# (workflow, argv, extra env, argv run once before warming up, extra baseline modules)
+CASES = [
+    ('awscli', ['ec2 prod web'], {}, None, ()),
+    ('acli', ['me bug'], {}, None, ()),
+    ('katakana', ['computer'], {}, None, ()),
+    ('slack', [], {'query': 'dev'}, None, ()),
+    ('slack', [], {'query': 'dev', **SLACK_SETTINGS}, ['--sync'], ('sqlite3',)),
+]
+
+
+def module_times(stderr):
+    """Parse -X importtime output into {module: self microseconds}, nested imports included"""
+    imports = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue
+        imports[parts[2].strip()] = int(parts[0])
+    return imports
+
+
+def baseline_imports(extra=()):
+    """Modules loaded by a bare interpreter plus BASELINE_IMPORTS, `extra` and everything they pull in"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f"import {', '.join(BASELINE_IMPORTS + extra)}"],
+                            capture_output=True, text=True)
+    return set(module_times(result.stderr))
+
+
+def measure(workflow, args, env, setup, runs, baseline, stub, slack):
+    with Sandbox(workflow) as sandbox:
+        env = {'SLACK_API_URL': slack.url, **env}
+        if setup:
+            sandbox.run(setup, **env)
+            sandbox.wait_for_background()
+        # 预热时缓存未命中，Jisho 请求打到本地 stub；同时写好 .pyc
+        sandbox.run(args, JISHO_API_URL=stub.url, PYTHONDONTWRITEBYTECODE='', **env)
+        sandbox.wait_for_background()
+        sandbox.reset_calls()
+        stub.requests.clear()
+        slack.requests.clear()
+
+        import_ms, wall_ms, modules = [], [], {}
+        for _ in range(runs):
+            # 空值等于没设，让子进程像在 Alfred 里一样使用 .pyc 缓存
+            elapsed, _, stderr = sandbox.run(args, python_flags=('-X', 'importtime'), PYTHONDONTWRITEBYTECODE='', **env)
+            modules = {name: us for name, us in module_times(stderr).items() if name not in baseline}
+            import_ms.append(sum(modules.values()) / 1000)
+            wall_ms.append(elapsed * 1000)
+
+        return {
+            'import_ms': min(import_ms),
+            'wall_ms': statistics.median(wall_ms),
+            'modules': sorted(modules.items(), key=lambda x: -x[1])[:5],
+            'calls': sandbox.calls() + [f"jisho {keyword}" for keyword, _ in stub.requests]
+                     + [f"slack {method}" for method, _, _ in slack.requests],
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float, default=float(os.getenv('STARTUP_BUDGET_MS', DEFAULT_BUDGET_MS)))
+    options = parser.parse_args()
+
+    baselines = {extra: baseline_imports(extra) for extra in {case[4] for case in CASES}}
+    failures = []
+    with JishoStub() as stub, SlackStub(make_channels(2000), page_size=1000) as slack:
+        for workflow, args, env, setup, extra in CASES:
+            result = measure(workflow, args, env, setup, options.runs, baselines[extra], stub, slack)
+            heaviest = ', '.join(f"{name} {us / 1000:.1f}" for name, us in result['modules'])
+            if setup:
+                workflow = f"{workflow} ({' '.join(setup).lstrip('-')})"
+            print(f"{workflow:<13} imports {result['import_ms']:6.1f} ms  wall {result['wall_ms']:6.1f} ms  [{heaviest}]")
+
+            if result['import_ms'] > options.budget_ms:
+                failures.append(f"{workflow}: cached-path imports took {result['import_ms']:.1f} ms (budget {options.budget_ms:.1f} ms)")
+            if result['calls']:
+                failures.append(f"{workflow}: cached path made calls {result['calls']}")
+
+    for failure in failures:
+        print(f"FAIL {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
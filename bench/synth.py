@@ -0,0 +1,123 @@
+"""Synthetic inventories for scale benchmarks.
+
+Writes fixture files in the same layout as bench/fixtures, so the fake CLIs
+replay them unchanged. Generation is seeded and therefore reproducible.
+
+Usage: python3 bench/synth.py OUTPUT_DIR [--ec2 10000] [--lambda 5000] [--jira 20000] [--repos 5000]
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import time
+
+from sandbox import FIXTURES
+
+TEAMS = ['payments', 'frontend', 'platform', 'data', 'search', 'growth', 'identity', 'billing']
+ROLES = ['web-server', 'api-server', 'worker', 'batch', 'bastion', 'cache-proxy', 'scheduler', 'ingest']
+ENVS = ['prod', 'stg', 'dev']
+STATES = ['running'] * 8 + ['stopped', 'pending']
+RUNTIMES = ['python3.12', 'python3.11', 'nodejs20.x', 'nodejs18.x', 'java21', 'provided.al2023']
+ISSUE_WORDS = ['bug', 'fix', 'upgrade', 'migrate', 'alert', 'latency', 'index', 'backup', 'replica',
+               'failover', 'query', 'timeout', 'dashboard', 'runbook', 'rotate', 'certificate']
+
+
+def ec2_instances(count, rng):
+    instances = []
+    for n in range(count):
+        team = rng.choice(TEAMS)
+        env = rng.choice(ENVS)
+        name = f"{env}-{rng.choice(ROLES)}-{n}"
+        subnet = rng.randrange(32)
+        instance = {
+            "InstanceId": f"i-{n:017x}",
+            "InstanceType": rng.choice(['t3.medium', 'm5.large', 'c6g.xlarge', 'r6i.2xlarge']),
+            "State": {"Code": 16, "Name": rng.choice(STATES)},
+            "PrivateIpAddress": f"10.{subnet}.{n // 250 % 250}.{n % 250 + 1}",
+            "SubnetId": f"subnet-{subnet:08x}",
+            "VpcId": f"vpc-{ENVS.index(env):08x}",
+            "LaunchTime": f"2024-{rng.randrange(1, 13):02d}-{rng.randrange(1, 29):02d}T00:00:00+00:00",
+            "Tags": [{"Key": "Name", "Value": name}, {"Key": "team", "Value": team}, {"Key": "env", "Value": env}],
+        }
+        if 'web' in name:
+            instance["PublicIpAddress"] = f"54.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(256)}"
+        instances.append(instance)
+    return instances
+
+
+def lambda_functions(count, rng):
+    return [{
+        "FunctionName": f"{rng.choice(TEAMS)}-{rng.choice(ROLES)}-{n}",
+        "FunctionArn": f"arn:aws:lambda:ap-northeast-1:123456789012:function:fn-{n}",
+        "Runtime": rng.choice(RUNTIMES),
+        "MemorySize": rng.choice([128, 256, 512, 1024]),
+        "LastModified": "2024-06-01T00:00:00.000+0000",
+    } for n in range(count)]
+
+
+def jira_issues(count, rng):
+    issues = []
+    for n in range(count, 0, -1):
+        words = rng.sample(ISSUE_WORDS, 3)
+        # 一个半小时左右一个 issue，从 2019-01-01 开始
+        created = time.strftime('%Y-%m-%dT%H:%M:%S.000+0000', time.gmtime(1546300800 + n * 5400))
+        issues.append({
+            "key": f"DBRE-{n}",
+            "fields": {
+                "summary": f"{words[0].capitalize()} {words[1]} for {rng.choice(TEAMS)} {words[2]}",
+                "status": {"name": rng.choice(['To Do', 'In Progress', 'In Review', 'Done'])},
+                "created": created,
+            },
+        })
+    return issues
+
+
+def github_repos(count, rng):
+    repos = []
+    for n in range(count):
+        full_name = f"org-{rng.choice(TEAMS)}/{rng.choice(TEAMS)}-{rng.choice(ROLES)}-{n}"
+        repos.append({
+            "id": 500000 + n,
+            "name": full_name.split('/')[1],
+            "full_name": full_name,
+            "html_url": f"https://github.com/{full_name}",
+            "ssh_url": f"git@github.com:{full_name}.git",
+            "clone_url": f"https://github.com/{full_name}.git",
+            "archived": False,
+            # 按 pushed_at 倒序，与 sort=pushed 的返回顺序一致
+            "pushed_at": time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(1764547200 - n * 3600)),
+        })
+    return repos
+
+
+def write_fixtures(output_dir, ec2=10000, functions=5000, jira=20000, repos=5000, seed=42):
+    """Copy the recorded fixtures to output_dir and overwrite the scaled inventories"""
+    rng = random.Random(seed)
+    shutil.copytree(FIXTURES, output_dir, dirs_exist_ok=True)
+    generated = {
+        os.path.join('aws', 'ec2-describe-instances.json'): ec2_instances(ec2, rng),
+        os.path.join('aws', 'lambda-list-functions.json'): lambda_functions(functions, rng),
+        os.path.join('acli', 'workitem-search.json'): jira_issues(jira, rng),
+        os.path.join('gh', 'user-repos.json'): github_repos(repos, rng),
+    }
+    for path, data in generated.items():
+        with open(os.path.join(output_dir, path), 'w') as f:
+            json.dump(data, f)
+    return output_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('output_dir')
+    parser.add_argument('--ec2', type=int, default=10000)
+    parser.add_argument('--lambda', dest='functions', type=int, default=5000)
+    parser.add_argument('--jira', type=int, default=20000)
+    parser.add_argument('--repos', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=42)
+    options = parser.parse_args()
+    write_fixtures(options.output_dir, options.ec2, options.functions, options.jira, options.repos, options.seed)
+
+
+if __name__ == '__main__':
+    main()
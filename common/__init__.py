@@ -0,0 +1,6 @@
+"""Helpers shared by the workflow-* Script Filters.
+
+Each workflow directory is symlinked into Alfred on its own, so main.py
+resolves its real path and puts the repository root on sys.path before
+importing from here.
+"""
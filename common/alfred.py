@@ -0,0 +1,27 @@
+"""Script Filter JSON output.
+
+Alfred's `cache` object is not keyed by the query: while it is valid, Alfred
+shows the previous results without running the script at all, even if the
+user has typed something else. Our Script Filters filter on the argument
+themselves ("Alfred filters results" is off), so a response may only carry
+`cache` when no query could change it, e.g. a configuration error. Typed
+results rely on the workflows' own caches instead.
+
+`rerun` makes Alfred run the script again with the same query after the given
+number of seconds. Use it while a background refresh is filling a cache.
+"""
+MIN_CACHE_SECONDS = 5
+MAX_CACHE_SECONDS = 86400
+
+
+def script_filter(items, rerun=None, cache_seconds=None, loosereload=True):
+    """Build the Script Filter response, cache_seconds is clamped to what Alfred accepts"""
+    response = {"items": items}
+    if rerun:
+        response["rerun"] = min(max(rerun, 0.1), 5.0)
+    if cache_seconds is not None:
+        response["cache"] = {
+            "seconds": int(min(max(cache_seconds, MIN_CACHE_SECONDS), MAX_CACHE_SECONDS)),
+            "loosereload": loosereload,
+        }
+    return response
@@ -0,0 +1,221 @@
+"""Bounded execution of the CLIs behind the Script Filters (aws, acli).
+
+Every call runs in its own process group with a deadline. When the deadline
+passes, the whole group is killed, including any helpers the CLI started.
+stdout is read in chunks and counted against a size cap. run_json() decodes
+a top-level JSON array one element at a time while the pipe is still being
+read, so each record can be projected down to the fields the workflow uses
+before the next one arrives. Neither the whole output text nor the unused
+fields are kept in memory.
+
+Failures raise CommandError. Its `kind` is one of NOT_FOUND, TIMEOUT,
+TOO_LARGE, FAILED or DECODE. Callers turn it into the {"error", "message"}
+dicts their Script Filters already render.
+"""
+import codecs
+import json
+import os
+import signal
+import subprocess
+import threading
+
+DEFAULT_TIMEOUT = 60
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+STDERR_MAX_BYTES = 64 * 1024
+CHUNK_SIZE = 64 * 1024
+
+NOT_FOUND = 'NotFound'
+TIMEOUT = 'Timeout'
+TOO_LARGE = 'OutputTooLarge'
+FAILED = 'Failed'
+DECODE = 'DecodeError'
+
+_WHITESPACE = ' \t\n\r'
+_NUMBER_CHARS = '0123456789.eE+-'
+
+
+class CommandError(Exception):
+    def __init__(self, kind, message, returncode=None, stderr=''):
+        super().__init__(message)
+        self.kind = kind
+        self.message = message
+        self.returncode = returncode
+        self.stderr = stderr
+
+
+class _TextSink:
+    def __init__(self):
+        self.parts = []
+
+    def feed(self, text, final=False):
+        self.parts.append(text)
+
+    def result(self):
+        return ''.join(self.parts)
+
+
+class _JSONSink:
+    """
+    增量解码：顶层是数组时逐个元素 raw_decode 并立即投影，其他 JSON 在读完后整体解码
+    元素被 chunk 截断时先攒着，等未解析部分翻倍后再试，避免大元素被反复从头拼接和解析
+    """
+    def __init__(self, project):
+        self.project = project
+        self.decoder = json.JSONDecoder()
+        self.pending = []
+        self.pending_size = 0
+        self.retry_at = 0
+        self.state = 'start'  # start, first, value, separator, done, document
+        self.records = []
+
+    def feed(self, text, final=False):
+        self.pending.append(text)
+        self.pending_size += len(text)
+        if self.state == 'document' or (self.pending_size < self.retry_at and not final):
+            return
+
+        buffer = ''.join(self.pending)
+        position = self._parse(buffer, final)
+        self.pending = [buffer[position:]]
+        self.pending_size = len(buffer) - position
+
+    def _parse(self, buffer, final):
+        position = 0
+        while True:
+            while position < len(buffer) and buffer[position] in _WHITESPACE:
+                position += 1
+            if position == len(buffer):
+                return position
+
+            char = buffer[position]
+            if self.state == 'start':
+                if char != '[':
+                    self.state = 'document'
+                    return 0
+                self.state = 'first'
+                position += 1
+            elif self.state == 'separator' or (self.state == 'first' and char == ']'):
+                if char not in ',]':
+                    raise ValueError(f"Expecting ',' or ']' near {buffer[position:position + 20]!r}")
+                self.state = 'value' if char == ',' else 'done'
+                position += 1
+            elif self.state in ('first', 'value'):
+                try:
+                    value, end = self.decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    if final:
+                        raise
+                    self.retry_at = (len(buffer) - position) * 2
+                    return position
+                # 数字可能被 chunk 截断（"12" + "3"、"2." + "5"），要看到后面的字符再确认
+                if not final and (end == len(buffer) or buffer[end] in _NUMBER_CHARS):
+                    self.retry_at = 0
+                    return position
+                self.records.append(self.project(value) if self.project else value)
+                self.retry_at = 0
+                self.state = 'separator'
+                position = end
+            else:
+                raise ValueError(f"Extra data near {buffer[position:position + 20]!r}")
+
+    def result(self):
+        if self.state == 'document':
+            return json.loads(''.join(self.pending))
+        if self.state == 'start':
+            raise ValueError("no JSON output")
+        if self.state != 'done':
+            raise ValueError("unterminated JSON array")
+        return self.records
+
+
+def _kill_group(process):
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def _drain(stream, parts):
+    """读完 stderr 防止子进程写满管道阻塞，只保留末尾 STDERR_MAX_BYTES"""
+    size = 0
+    for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+        parts.append(chunk)
+        size += len(chunk)
+        while size > STDERR_MAX_BYTES and len(parts) > 1:
+            size -= len(parts.pop(0))
+    stream.close()
+
+
+def _run(command, timeout, max_bytes, sink):
+    name = os.path.basename(command[0])
+    try:
+        process = subprocess.Popen(
+            command, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            start_new_session=True
+        )
+    except FileNotFoundError:
+        raise CommandError(NOT_FOUND, f"{name} is not in your PATH.")
+
+    expired = threading.Event()
+
+    def expire():
+        expired.set()
+        _kill_group(process)
+
+    timer = threading.Timer(timeout, expire)
+    timer.daemon = True
+    timer.start()
+    stderr_parts = []
+    drain = threading.Thread(target=_drain, args=(process.stderr, stderr_parts), daemon=True)
+    drain.start()
+
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    received = 0
+    decode_error = None
+    try:
+        fd = process.stdout.fileno()
+        while True:
+            chunk = os.read(fd, CHUNK_SIZE)
+            if not chunk:
+                break
+            received += len(chunk)
+            if received > max_bytes:
+                raise CommandError(TOO_LARGE, f"{name} output exceeded {max_bytes / (1024 * 1024):.3g} MB")
+            if decode_error is None:
+                try:
+                    sink.feed(decoder.decode(chunk))
+                except ValueError as e:
+                    # 继续读到 EOF 拿退出码，命令失败时报 FAILED 而不是解析错误
+                    decode_error = e
+        process.wait()
+    finally:
+        timer.cancel()
+        if process.poll() is None:
+            _kill_group(process)
+            process.wait()
+        process.stdout.close()
+        drain.join(1)
+
+    stderr = b''.join(stderr_parts).decode('utf-8', errors='replace').strip()
+    if expired.is_set():
+        raise CommandError(TIMEOUT, f"{name} did not finish within {timeout:g}s", process.returncode, stderr)
+    if process.returncode != 0:
+        raise CommandError(FAILED, stderr or f"{name} exited with status {process.returncode}",
+                           process.returncode, stderr)
+    try:
+        if decode_error is not None:
+            raise decode_error
+        sink.feed(decoder.decode(b'', final=True), final=True)
+        return sink.result()
+    except ValueError as e:
+        raise CommandError(DECODE, f"Failed to parse {name} output: {e}", process.returncode, stderr)
+
+
+def run_text(command, timeout=DEFAULT_TIMEOUT, max_bytes=DEFAULT_MAX_BYTES):
+    """Run command and return its stdout as text"""
+    return _run(command, timeout, max_bytes, _TextSink())
+
+
+def run_json(command, timeout=DEFAULT_TIMEOUT, max_bytes=DEFAULT_MAX_BYTES, project=None):
+    """Run command and decode its JSON stdout, applying project() to each element of a top-level array"""
+    return _run(command, timeout, max_bytes, _JSONSink(project))
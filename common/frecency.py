@@ -0,0 +1,74 @@
+"""Usage log for frecency ranking.
+
+Every selection bumps a per-key score that decays exponentially over time.
+The log is a small JSON file of {key: [score, last_used]} capped at
+MAX_ENTRIES keys, so loading and ranking stay well under a millisecond.
+"""
+import json
+import math
+import os
+import time
+
+HALF_LIFE = 14 * 86400
+MAX_ENTRIES = 300
+WEIGHT = 0.5
+
+
+class UsageLog:
+    def __init__(self, path, half_life=HALF_LIFE, max_entries=MAX_ENTRIES):
+        self.path = path
+        self.half_life = half_life
+        self.max_entries = max_entries
+        self._entries = None
+
+    @property
+    def entries(self):
+        if self._entries is None:
+            try:
+                with open(self.path, 'r') as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError):
+                self._entries = {}
+        return self._entries
+
+    def _decayed(self, entry, now):
+        score, last_used = entry
+        return score * 0.5 ** (max(now - last_used, 0) / self.half_life)
+
+    def score(self, key, now=None):
+        """Current decayed usage score of a key, 0.0 if it was never used"""
+        entry = self.entries.get(key)
+        if not entry:
+            return 0.0
+        return self._decayed(entry, now or time.time())
+
+    def record(self, key, now=None):
+        """Record a selection and persist the log, dropping the weakest keys past the cap"""
+        now = now or time.time()
+        entries = self.entries
+        entries[key] = [self.score(key, now) + 1.0, now]
+
+        if len(entries) > self.max_entries:
+            keep = sorted(entries, key=lambda k: self._decayed(entries[k], now), reverse=True)
+            self._entries = entries = {k: entries[k] for k in keep[:self.max_entries]}
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(entries, f)
+        os.replace(tmp_path, self.path)
+
+    def rank(self, candidates, key, match_score, weight=WEIGHT):
+        """
+        Sort candidates by match score boosted by frecency.
+
+        Candidates that were never selected keep their match score, so ties
+        keep the caller's original order.
+        """
+        if not self.entries:
+            return sorted(candidates, key=lambda c: -match_score(c))
+        now = time.time()
+        return sorted(
+            candidates,
+            key=lambda c: -match_score(c) * (1 + weight * math.log1p(self.score(key(c), now)))
+        )
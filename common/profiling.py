@@ -0,0 +1,155 @@
+"""Slow-run profiling for the Script Filters.
+
+Set WORKFLOW_PROFILE=1 in a workflow's environment variables to run every
+invocation under cProfile. common.timing starts the profiler when it is
+imported, which is the first thing each main.py does, and hands the run to
+finish() from timing.flush(). Runs that take WORKFLOW_PROFILE_MS (default
+200) or longer are kept in <data dir>/profiles/ as <id>.prof (pstats) plus
+<id>.json (query, total_ms, spans and tags such as cache=hit/miss). Only the
+newest MAX_PROFILES runs per workflow are kept. cProfile adds overhead to
+every run, so leave it off when you are not investigating.
+
+    python3 -m common.profiling list [--limit N] [DIR ...]
+    python3 -m common.profiling show ID [--top N] [DIR ...]
+"""
+import json
+import os
+import sys
+import time
+
+PROFILE_DIR = 'profiles'
+MAX_PROFILES = 50
+DEFAULT_THRESHOLD_MS = 200
+
+_profiler = None
+
+
+def start():
+    """Start profiling this process"""
+    global _profiler
+    import cProfile
+
+    _profiler = cProfile.Profile()
+    _profiler.enable()
+
+
+def finish(data_dir, workflow, query, total_ms, spans, tags):
+    """Stop profiling and keep the profile if the run was slow. Returns the profile id or None"""
+    if _profiler is None:
+        return None
+    _profiler.disable()
+
+    threshold = float(os.getenv('WORKFLOW_PROFILE_MS', DEFAULT_THRESHOLD_MS))
+    if total_ms < threshold:
+        return None
+
+    profile_dir = os.path.join(data_dir, PROFILE_DIR)
+    profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{workflow}"
+    record = {
+        'id': profile_id,
+        'ts': round(time.time(), 3),
+        'workflow': workflow,
+        'query': query,
+        'argv': sys.argv[1:],
+        'total_ms': round(total_ms, 3),
+        'spans': {name: round(ms, 3) for name, ms in spans.items()},
+        'tags': tags,
+    }
+    try:
+        os.makedirs(profile_dir, exist_ok=True)
+        _profiler.dump_stats(os.path.join(profile_dir, f"{profile_id}.prof"))
+        with open(os.path.join(profile_dir, f"{profile_id}.json"), 'w') as f:
+            json.dump(record, f, ensure_ascii=False)
+        _prune(profile_dir, workflow)
+    except OSError as e:
+        print(f"Failed to save profile: {e}", file=sys.stderr)
+        return None
+    return profile_id
+
+
+def _prune(profile_dir, workflow):
+    """每个 workflow 只保留最新的 MAX_PROFILES 份，id 以时间开头，按名字排序即按时间排序"""
+    suffix = f"-{workflow}.json"
+    ids = sorted(name[:-len('.json')] for name in os.listdir(profile_dir) if name.endswith(suffix))
+    for profile_id in ids[:-MAX_PROFILES]:
+        for ext in ('.json', '.prof'):
+            try:
+                os.remove(os.path.join(profile_dir, profile_id + ext))
+            except FileNotFoundError:
+                pass
+
+
+def _records(paths):
+    from common.timing import data_dirs
+
+    records = []
+    for data_dir in data_dirs(paths):
+        profile_dir = os.path.join(data_dir, PROFILE_DIR)
+        if not os.path.isdir(profile_dir):
+            continue
+        for name in os.listdir(profile_dir):
+            if not name.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(profile_dir, name), 'r') as f:
+                    record = json.load(f)
+            except (OSError, ValueError):
+                continue
+            record['path'] = os.path.join(profile_dir, name[:-len('.json')] + '.prof')
+            records.append(record)
+    return records
+
+
+def list_profiles(paths, limit):
+    """Print the slowest saved runs"""
+    records = sorted(_records(paths), key=lambda record: -record.get('total_ms', 0))[:limit]
+    if not records:
+        print("No profiles saved. Set WORKFLOW_PROFILE=1 in the workflow's environment variables.")
+        return 1
+
+    print(f"{'id':<40} {'total':>9} {'cache':<6} query")
+    for record in records:
+        cache = str(record.get('tags', {}).get('cache', '-'))
+        print(f"{record['id']:<40} {record['total_ms']:>7.1f}ms {cache:<6} {record.get('query', '')!r}")
+    return 0
+
+
+def show_profile(paths, profile_id, top):
+    """Print the run's context and its top hotspots by cumulative and by own time"""
+    import pstats
+
+    matches = [record for record in _records(paths) if record['id'].startswith(profile_id)]
+    if len(matches) != 1:
+        print(f"{len(matches)} profiles match '{profile_id}'", file=sys.stderr)
+        return 1
+
+    record = matches[0]
+    print(f"{record['id']}  {record['workflow']}  query={record.get('query', '')!r}  total {record['total_ms']:.1f} ms")
+    print(f"tags:  {json.dumps(record.get('tags', {}), ensure_ascii=False)}")
+    print("spans: " + ", ".join(f"{name} {ms:.1f} ms" for name, ms in record.get('spans', {}).items()))
+    stats = pstats.Stats(record['path'], stream=sys.stdout)
+    stats.strip_dirs()
+    for sort_key in ('cumulative', 'tottime'):
+        stats.sort_stats(sort_key).print_stats(top)
+    return 0
+
+
+def main(argv):
+    import argparse
+
+    parser = argparse.ArgumentParser(prog='python3 -m common.profiling', description='Inspect saved slow-run profiles')
+    parser.add_argument('command', choices=('list', 'show'))
+    parser.add_argument('args', nargs='*', metavar='ID|DIR', help='show: profile id (or a unique prefix), then data directories')
+    parser.add_argument('--limit', type=int, default=20, help='list: number of runs')
+    parser.add_argument('--top', type=int, default=15, help='show: number of functions')
+    options = parser.parse_intermixed_args(argv)
+
+    if options.command == 'list':
+        return list_profiles(options.args, options.limit)
+    if not options.args:
+        parser.error('show needs a profile id')
+    return show_profile(options.args[1:], options.args[0], options.top)
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,182 @@
+"""Span-based timing for the Script Filters.
+
+Wrap each phase of a run in `with span('fetch'):` and call flush() once the
+items are printed. Spans are recorded only when WORKFLOW_METRICS=1 is set or
+Alfred's debugger is open (alfred_debug=1, spans are echoed to stderr). When
+neither is set, span() returns a shared no-op context manager and flush()
+returns immediately.
+
+Each recorded run becomes one line in <data dir>/metrics.jsonl; total_ms
+counts from the import of this module, not from interpreter start. The file
+rotates at MAX_BYTES and keeps BACKUPS old files. Summarise with:
+
+    python3 -m common.timing stats [FILE_OR_DIR ...]
+
+WORKFLOW_PROFILE=1 additionally runs the whole invocation under cProfile and
+keeps the profiles of slow runs, see common/profiling.py.
+"""
+import json
+import os
+import sys
+import time
+
+METRICS_FILE = 'metrics.jsonl'
+MAX_BYTES = 1024 * 1024
+BACKUPS = 3
+
+DEBUG = os.getenv('alfred_debug') == '1'
+METRICS = DEBUG or os.getenv('WORKFLOW_METRICS', '') not in ('', '0')
+PROFILE = os.getenv('WORKFLOW_PROFILE', '') not in ('', '0')
+ENABLED = METRICS or PROFILE
+
+_started = time.perf_counter()
+_spans = {}
+_tags = {}
+
+if PROFILE:
+    from common import profiling
+    profiling.start()
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = (time.perf_counter() - self.start) * 1000
+        _spans[self.name] = _spans.get(self.name, 0.0) + elapsed
+        if DEBUG:
+            print(f"DEBUG: {self.name} took {elapsed:.1f} ms", file=sys.stderr)
+        return False
+
+
+def span(name):
+    """Time a phase. Repeated spans with the same name are summed"""
+    return _Span(name) if ENABLED else _NULL_SPAN
+
+
+def tag(**tags):
+    """Attach context to the current run, e.g. tag(cache='hit')"""
+    if ENABLED:
+        _tags.update(tags)
+
+
+def current():
+    """Spans and tags recorded so far in this run"""
+    return {'spans': dict(_spans), 'tags': dict(_tags)}
+
+
+def flush(data_dir, workflow, query=''):
+    """Append this run to the metrics file, rotating it when it grows past MAX_BYTES, and keep its profile if slow"""
+    if not ENABLED:
+        return
+    total = (time.perf_counter() - _started) * 1000
+    if DEBUG:
+        print(f"DEBUG: total {total:.1f} ms", file=sys.stderr)
+    if PROFILE:
+        profile_id = profiling.finish(data_dir, workflow, query, total, _spans, _tags)
+        if profile_id and DEBUG:
+            print(f"DEBUG: profile saved as {profile_id}", file=sys.stderr)
+    if not METRICS:
+        return
+
+    record = {
+        'ts': round(time.time(), 3),
+        'workflow': workflow,
+        'query': query,
+        'total_ms': round(total, 3),
+        'spans': {name: round(ms, 3) for name, ms in _spans.items()},
+        'tags': _tags,
+    }
+    path = os.path.join(data_dir, METRICS_FILE)
+    try:
+        os.makedirs(data_dir, exist_ok=True)
+        if os.path.exists(path) and os.path.getsize(path) > MAX_BYTES:
+            for n in range(BACKUPS - 1, 0, -1):
+                if os.path.exists(f"{path}.{n}"):
+                    os.replace(f"{path}.{n}", f"{path}.{n + 1}")
+            os.replace(path, f"{path}.1")
+        with open(path, 'a') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+    except OSError as e:
+        print(f"Failed to write metrics: {e}", file=sys.stderr)
+
+
+def data_dirs(paths=None):
+    """The given paths, or every workflow data directory on this machine"""
+    if paths:
+        return paths
+    import glob
+    paths = glob.glob(os.path.expanduser('~/.alfred_workflow_data*'))
+    paths += glob.glob(os.path.expanduser('~/Library/Application Support/Alfred/Workflow Data/*'))
+    if os.getenv('alfred_workflow_data'):
+        paths.append(os.getenv('alfred_workflow_data'))
+    return paths
+
+
+def _metrics_files(paths):
+    paths = data_dirs(paths)
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for n in range(BACKUPS, 0, -1):
+                if os.path.exists(os.path.join(path, f"{METRICS_FILE}.{n}")):
+                    files.append(os.path.join(path, f"{METRICS_FILE}.{n}"))
+            path = os.path.join(path, METRICS_FILE)
+        if os.path.exists(path):
+            files.append(path)
+    return files
+
+
+def _percentile(ordered, pct):
+    return ordered[max(0, -(-len(ordered) * pct // 100) - 1)]
+
+
+def stats(paths):
+    """Print per-workflow, per-phase latency percentiles"""
+    phases = {}
+    for path in _metrics_files(paths):
+        with open(path, 'r') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                workflow = phases.setdefault(record.get('workflow', '?'), {})
+                workflow.setdefault('total', []).append(record.get('total_ms', 0.0))
+                for name, ms in record.get('spans', {}).items():
+                    workflow.setdefault(name, []).append(ms)
+
+    if not phases:
+        print("No metrics recorded. Set WORKFLOW_METRICS=1 in the workflow's environment variables.")
+        return 1
+
+    print(f"{'workflow':<10} {'phase':<12} {'count':>6} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}  (ms)")
+    for workflow in sorted(phases):
+        for name, samples in sorted(phases[workflow].items(), key=lambda x: x[0] == 'total'):
+            ordered = sorted(samples)
+            print(f"{workflow:<10} {name:<12} {len(ordered):>6} {_percentile(ordered, 50):>9.1f} "
+                  f"{_percentile(ordered, 95):>9.1f} {_percentile(ordered, 99):>9.1f} {ordered[-1]:>9.1f}")
+    return 0
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2 or sys.argv[1] != 'stats':
+        print("Usage: python3 -m common.timing stats [FILE_OR_DIR ...]", file=sys.stderr)
+        sys.exit(2)
+    sys.exit(stats(sys.argv[2:]))
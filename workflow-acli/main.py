@@ -1,11 +1,14 @@
 # -*- coding: utf-8 -*-
 import sys
 import json
-import subprocess
 import os
 import time
 import hashlib
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+from common import alfred, timing
+from common.frecency import UsageLog
+
 def load_env_file():
     """Load environment variables from .env file"""
     env_vars = {}
@@ -22,7 +25,8 @@ def load_env_file():
     return env_vars
 
 # Load configuration from .env file
-env_config = load_env_file()
+with timing.span('config'):
+    env_config = load_env_file()
 
 # --- Configuration ---
 JIRA_USERNAME = env_config.get('JIRA_USERNAME')
@@ -31,84 +35,347 @@ DEFAULT_JQL_PROJECT = f"project = {env_config.get('JIRA_PROJECT', 'DBRE')}"
 jira_type_value = env_config.get('JIRA_TYPE', 'タスク')
 DEFAULT_JQL_TYPE = f'Type = "{jira_type_value}"' if jira_type_value else ""
 CACHE_EXPIRY = 3600
+CONFIG_ERROR_CACHE = 30
+ISSUE_FIELDS = 'key,summary,status'
+PAGE_SIZE = 100
+ACLI_WORKERS = int(env_config.get('ACLI_WORKERS', 4))
+ACLI_TIMEOUT = float(env_config.get('ACLI_TIMEOUT', 60))
+FETCH_ALL_RERUN = 1.0
+FETCH_ALL_TIMEOUT = 600
+FETCH_ALL_RETRY_DELAY = 60
 CACHE_DIR = os.getenv('alfred_workflow_data', os.path.expanduser('~/.alfred_workflow_data_jira'))
-if not os.path.exists(CACHE_DIR):
-    os.makedirs(CACHE_DIR)
+USAGE_LOG_PATH = os.path.join(CACHE_DIR, 'usage.json')
+
+def _project_issue(issue):
+    """只保留 key、summary 和 status 名，读取管道时就丢掉 acli 输出的其余字段"""
+    fields = issue.get("fields") or {}
+    projected = {"summary": fields["summary"]} if "summary" in fields else {}
+    if fields.get("status"):
+        projected["status"] = {"name": fields["status"].get("name", "No Status")}
+    return {"key": issue.get("key"), "fields": projected}
+
+def _run_acli_search(jql_query, options, parse=None):
+    """执行一次 acli jira workitem search，出错时返回 error dict；parse 为空时按 JSON 流式解析"""
+    from common import executor
+    command = [
+        'acli', 'jira', 'workitem', 'search',
+        '--jql', jql_query
+    ]
+    command.extend(options)
+
+    try:
+        with timing.span('fetch'):
+            if parse is None:
+                return executor.run_json(command, timeout=ACLI_TIMEOUT, project=_project_issue)
+            output = executor.run_text(command, timeout=ACLI_TIMEOUT)
+        with timing.span('parse'):
+            return parse(output)
+    except executor.CommandError as e:
+        if e.kind == executor.NOT_FOUND:
+            return {"error": "ACLI not found", "message": "Atlassian CLI (acli) is not in your PATH."}
+        if e.kind == executor.TIMEOUT:
+            return {"error": "ACLI timed out", "message": e.message}
+        if e.kind == executor.DECODE:
+            return {"error": "JSON Decode Error", "message": "Failed to parse acli output."}
+        return {"error": "ACLI command failed", "message": e.message}
+    except ValueError:
+        return {"error": "Parse Error", "message": "Failed to parse acli output."}
 
 def _execute_acli_command_actual(jql_query, paginate=False):
-    """实际执行 acli 命令的内部函数，并包含调试日志"""
+    """实际执行 acli 命令的内部函数"""
+    options = ['--json', '--fields', ISSUE_FIELDS]
+    if paginate:
+        options.append('--paginate')
+    else:
+        options.extend(['--limit', '50'])
+    return _run_acli_search(jql_query, options)
+
+def _parse_count(output):
+    """acli --count 的输出形如 'Number of work items in the search: 123'，取最后一个数字"""
+    import re
+    numbers = re.findall(r'\d+', output)
+    if not numbers:
+        raise ValueError(output)
+    return int(numbers[-1])
+
+def _is_error(data):
+    return isinstance(data, dict) and "error" in data
+
+def _key_sort(issue):
+    project_key, _, number = issue["key"].rpartition('-')
+    return project_key, int(number)
+
+def _created_at(jql_query):
+    """查询结果第一个 issue 的创建时间（epoch 秒），没有结果或解析不了时返回 None"""
+    from datetime import datetime
+
+    issues = _run_acli_search(jql_query, ['--json', '--fields', 'key,created', '--limit', '1'], parse=json.loads)
+    if _is_error(issues):
+        return issues
+    created = ((issues[0].get("fields") or {}).get("created") if issues else None) or ''
     try:
-        command = [
-            'acli', 'jira', 'workitem', 'search',
-            '--jql', jql_query,
-            '--json'
-        ]
-        command.extend(['--fields', 'key,summary,status'])
-        if paginate:
-            command.append('--paginate')
-        else:
-            command.extend(['--limit', '50'])
-            
-        # --- VVVV  新增的调试日志 VVVV ---
-        # 1. 打印将要执行的命令到 stderr
-        # 为了方便阅读和复制，我们将命令列表格式化为字符串
-        printable_command = ' '.join(f"'{part}'" if ' ' in part else part for part in command)
-        print(f"DEBUG: Executing command -> {printable_command}", file=sys.stderr)
-
-        # 2. 记录开始时间
-        start_time = time.monotonic()
-        # --- ^^^^  新增结束 ^^^^ ---
-
-        result = subprocess.check_output(command, text=True, stderr=subprocess.PIPE)
-
-        # --- VVVV  新增的调试日志 VVVV ---
-        # 3. 记录结束时间并打印耗时
-        end_time = time.monotonic()
-        duration = end_time - start_time
-        print(f"DEBUG: Command finished in {duration:.3f} seconds.", file=sys.stderr)
-        # --- ^^^^  新增结束 ^^^^ ---
-        
-        return json.loads(result)
-    except FileNotFoundError:
-        print("DEBUG: Error -> acli command not found.", file=sys.stderr)
-        return {"error": "ACLI not found", "message": "Atlassian CLI (acli) is not in your PATH."}
-    except subprocess.CalledProcessError as e:
-        print(f"DEBUG: Error -> acli command failed with stderr: {e.stderr.strip()}", file=sys.stderr)
-        return {"error": "ACLI command failed", "message": e.stderr.strip()}
-    except json.JSONDecodeError:
-        print("DEBUG: Error -> Failed to decode JSON from acli.", file=sys.stderr)
-        return {"error": "JSON Decode Error", "message": "Failed to parse acli output."}
+        return datetime.strptime(created, '%Y-%m-%dT%H:%M:%S.%f%z').timestamp()
+    except ValueError:
+        return None
+
+def _plan_windows(oldest, newest, total):
+    """
+    acli 没有 offset 参数，第一页之后的 issue 按创建时间切成 [lo, hi) 区间代替 offset/limit 窗口
+    key 的边界只用 Jira 实际返回过的 key：JQL 里引用不存在（已删除或移走）的 key 会直接报错，
+    而日期边界不需要对应某个 issue。相邻窗口共用同一个边界，最早和最晚的窗口不设边界，
+    所以无论 Jira 按哪个时区解释日期，这些窗口都恰好覆盖全部剩余的 issue 且互不重叠
+    窗口按剩余数量均分时间范围，至少给每个 worker 两个窗口
+    """
+    remaining = max(total - PAGE_SIZE, 1)
+    windows_count = min(-(-remaining // PAGE_SIZE), ACLI_WORKERS * 2)
+    if oldest is None or newest is None:
+        windows_count = 1
+    bounds = sorted({
+        time.strftime('%Y/%m/%d %H:%M', time.localtime(oldest + (newest - oldest) * n / windows_count))
+        for n in range(1, windows_count)
+    }, reverse=True)
+    edges = [None] + bounds + [None]
+    return [[lo, hi] for hi, lo in zip(edges, edges[1:])]
+
+def _window_jql(jql, order, below, window):
+    lo, hi = window
+    clauses = [f"({jql})", f"key < {below}"]
+    if lo:
+        clauses.append(f'created >= "{lo}"')
+    if hi:
+        clauses.append(f'created < "{hi}"')
+    return f"{' AND '.join(clauses)} ORDER BY {order}"
+
+def _load_page(pages_dir, name):
+    try:
+        with open(os.path.join(pages_dir, f"{name}.json"), 'r') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+def _save_page(pages_dir, name, data):
+    os.makedirs(pages_dir, exist_ok=True)
+    path = os.path.join(pages_dir, f"{name}.json")
+    with open(f"{path}.tmp", 'w') as f:
+        json.dump(data, f)
+    os.replace(f"{path}.tmp", path)
+
+def _merge_pages(first_page, pages, order):
+    issues = first_page + [issue for page in pages if page for issue in page]
+    # 时间窗口和 key 的顺序不完全一致（从别的项目移过来的 issue 保留原来的创建时间）
+    if order.strip().lower() == 'key desc':
+        issues.sort(key=_key_sort, reverse=True)
+    return issues
+
+def fetch_all_pages(jql_query, cache_key):
+    """
+    --all 的并发分页拉取：先取第一页（key 最大的 PAGE_SIZE 个）和总数，
+    其余 issue 用有界线程池按创建时间窗口并发拉取，合并后按 key 排序
+    每个窗口到达后立即写入 <cache_key>.pages/：前台按键时先显示已到达的页，拉取失败后下一次只补缺失的窗口
+    """
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+    import shutil
+
+    pages_dir = os.path.join(CACHE_DIR, f"{cache_key}.pages")
+    plan_file = os.path.join(pages_dir, "plan.json")
+    if os.path.exists(plan_file) and time.time() - os.path.getmtime(plan_file) >= CACHE_EXPIRY:
+        shutil.rmtree(pages_dir, ignore_errors=True)
+
+    jql, _, order = jql_query.partition(' ORDER BY ')
+    order = order or 'key DESC'
+    plan = _load_page(pages_dir, "plan")
+    first_page = _load_page(pages_dir, "0")
+    if plan is None or "below" not in plan or first_page is None:
+        shutil.rmtree(pages_dir, ignore_errors=True)
+        first_page = _run_acli_search(f"{jql} ORDER BY key DESC", ['--json', '--fields', ISSUE_FIELDS, '--limit', str(PAGE_SIZE)])
+        if _is_error(first_page) or len(first_page) < PAGE_SIZE:
+            return first_page
+
+        # 第 0 页就是 key >= below 的全部 issue，其余窗口都限定 key < below
+        below = first_page[-1]["key"]
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            total = pool.submit(_run_acli_search, jql, ['--count'], parse=_parse_count)
+            oldest = pool.submit(_created_at, f"{jql} ORDER BY created ASC")
+            newest = pool.submit(_created_at, f"({jql}) AND key < {below} ORDER BY created DESC")
+            total, oldest, newest = total.result(), oldest.result(), newest.result()
+        for result in (total, oldest, newest):
+            if _is_error(result):
+                return result
+
+        plan = {"below": below, "windows": _plan_windows(oldest, newest, total)}
+        _save_page(pages_dir, "0", first_page)
+        _save_page(pages_dir, "plan", plan)
+
+    windows = plan["windows"]
+    pages = {n: _load_page(pages_dir, str(n + 1)) for n in range(len(windows))}
+    missing = [n for n, page in pages.items() if page is None]
+    timing.tag(pages=len(windows) + 1, pages_cached=len(windows) + 1 - len(missing))
+
+    error = None
+    if missing:
+        with ThreadPoolExecutor(max_workers=ACLI_WORKERS) as pool:
+            futures = {
+                pool.submit(_run_acli_search, _window_jql(jql, order, plan["below"], windows[n]),
+                            ['--json', '--fields', ISSUE_FIELDS, '--paginate']): n
+                for n in missing
+            }
+            for future in as_completed(futures):
+                page = future.result()
+                if _is_error(page):
+                    error = error or page
+                    continue
+                pages[futures[future]] = page
+                _save_page(pages_dir, str(futures[future] + 1), page)
+
+    # 有窗口失败时保留已拿到的页，下次只重试失败的窗口
+    if error:
+        return error
+
+    return _merge_pages(first_page, [pages[n] for n in range(len(windows))], order)
+
+def fetched_pages(jql_query, cache_key):
+    """后台 --all 拉取到目前为止已经写入 <cache_key>.pages/ 的 issue，第一页还没到时为空"""
+    pages_dir = os.path.join(CACHE_DIR, f"{cache_key}.pages")
+    order = jql_query.partition(' ORDER BY ')[2] or 'key DESC'
+    plan = _load_page(pages_dir, "plan")
+    first_page = _load_page(pages_dir, "0")
+    if plan is None or first_page is None:
+        return []
+    return _merge_pages(first_page, [_load_page(pages_dir, str(n + 1)) for n in range(len(plan.get("windows", [])))], order)
+
+def _cache_key(jql_query, paginate):
+    return hashlib.md5(f"{jql_query}_{paginate}".encode('utf-8')).hexdigest()
 
 def execute_acli_command(jql_query, paginate=False):
     """带缓存的 acli 命令执行器"""
-    cache_key_str = f"{jql_query}_{paginate}"
-    cache_key = hashlib.md5(cache_key_str.encode('utf-8')).hexdigest()
+    cache_key = _cache_key(jql_query, paginate)
     cache_file = os.path.join(CACHE_DIR, f"{cache_key}.json")
 
-    if os.path.exists(cache_file) and (time.time() - os.path.getmtime(cache_file)) < CACHE_EXPIRY:
-        # --- VVVV  新增的调试日志 VVVV ---
-        print("DEBUG: Loading from CACHE.", file=sys.stderr)
-        # --- ^^^^  新增结束 ^^^^ ---
-        with open(cache_file, 'r') as f:
-            return json.load(f)
+    with timing.span('cache'):
+        if os.path.exists(cache_file) and (time.time() - os.path.getmtime(cache_file)) < CACHE_EXPIRY:
+            timing.tag(cache='hit')
+            with open(cache_file, 'r') as f:
+                return json.load(f)
+    timing.tag(cache='miss')
             
-    # 如果缓存无效，则执行真实命令，该函数内部已包含日志
-    data = _execute_acli_command_actual(jql_query, paginate)
+    # 如果缓存无效，则执行真实命令
+    if paginate:
+        data = fetch_all_pages(jql_query, cache_key)
+    else:
+        data = _execute_acli_command_actual(jql_query, paginate)
     
     if "error" not in data:
-        with open(cache_file, 'w') as f:
-            json.dump(data, f)
+        with timing.span('cache'):
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            # 后台 --all 写入时前台可能正在读
+            with open(f"{cache_file}.{os.getpid()}.tmp", 'w') as f:
+                json.dump(data, f)
+            os.replace(f"{cache_file}.{os.getpid()}.tmp", cache_file)
+        # 已拿到的页留到缓存写好以后再删，前台在这之间一直能看到部分结果
+        if paginate:
+            import shutil
+            shutil.rmtree(os.path.join(CACHE_DIR, f"{cache_key}.pages"), ignore_errors=True)
             
     return data
 
+def fetch_all_markers(jql_query):
+    """后台 --all 拉取的状态文件：.lock 表示拉取中，.failed 里是出错时的 error dict"""
+    base = os.path.join(CACHE_DIR, _cache_key(jql_query, True))
+    return f"{base}.lock", f"{base}.failed"
+
+def marker_age(path):
+    try:
+        return time.time() - os.path.getmtime(path)
+    except OSError:
+        return None
+
+def background_fetch_all(jql_query):
+    """后台进程：拉取全部 issue 写入缓存，结束后清掉 .lock，失败时留下 .failed"""
+    pending, failed = fetch_all_markers(jql_query)
+    try:
+        data = execute_acli_command(jql_query, paginate=True)
+        if _is_error(data):
+            with open(failed, 'w') as f:
+                json.dump(data, f)
+        elif os.path.exists(failed):
+            os.remove(failed)
+    finally:
+        os.remove(pending)
+
+def start_background_fetch_all(jql_query):
+    import subprocess
+
+    pending, _ = fetch_all_markers(jql_query)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(pending, 'w') as f:
+        f.write(jql_query)
+    subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), '--fetch-all', jql_query],
+        stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        start_new_session=True
+    )
+
+def load_all_issues(jql_query):
+    """
+    --all 的结果：缓存有效时直接返回，否则拉取放到后台，先返回已经拿到的页
+    返回 (issues 或 error dict, rerun)
+    """
+    cache_file = os.path.join(CACHE_DIR, f"{_cache_key(jql_query, True)}.json")
+    with timing.span('cache'):
+        if os.path.exists(cache_file) and (time.time() - os.path.getmtime(cache_file)) < CACHE_EXPIRY:
+            timing.tag(cache='hit')
+            with open(cache_file, 'r') as f:
+                return json.load(f), None
+    timing.tag(cache='miss')
+
+    pending, failed = fetch_all_markers(jql_query)
+    pending_age, failed_age = marker_age(pending), marker_age(failed)
+    if pending_age is None or pending_age >= FETCH_ALL_TIMEOUT:
+        if failed_age is not None and failed_age < FETCH_ALL_RETRY_DELAY:
+            try:
+                with open(failed, 'r') as f:
+                    return json.load(f), None
+            except (OSError, json.JSONDecodeError):
+                pass
+        start_background_fetch_all(jql_query)
+
+    with timing.span('cache'):
+        return fetched_pages(jql_query, _cache_key(jql_query, True)), FETCH_ALL_RERUN
+
 # ... main() 和其他函数保持不变 ...
 def generate_alfred_item(title, subtitle, arg, uid):
     return {"uid": uid, "title": title, "subtitle": subtitle, "arg": arg, "valid": True}
 
+def match_score(search_terms, issue_key, summary):
+    """搜索词与 issue 的匹配分，JQL 已经过滤过，这里只用于排序"""
+    score = 1.0
+    summary_lower = summary.lower()
+    for term in search_terms:
+        term = term.lower()
+        if term == issue_key.lower():
+            score += 2.0
+        elif term in summary_lower:
+            score += 0.5
+    return score
+
+def record_selection(url):
+    """记录被打开的 issue，用于 frecency 排序"""
+    issue_key = url.rstrip('/').rsplit('/', 1)[-1]
+    if issue_key:
+        UsageLog(USAGE_LOG_PATH).record(issue_key)
+
 def main():
+    if len(sys.argv) > 2 and sys.argv[1] == '--record':
+        record_selection(sys.argv[2])
+        return
+    if len(sys.argv) > 2 and sys.argv[1] == '--fetch-all':
+        background_fetch_all(sys.argv[2])
+        return
+
     if not JIRA_USERNAME or not JIRA_BASE_URL:
         error_item = generate_alfred_item(title="Workflow Configuration Error", subtitle="Please create .env file with JIRA_USERNAME and JIRA_BASE_URL (see .env.example)", arg="", uid="config-error")
-        print(json.dumps({"items": [error_item]}))
+        # 配置缺失时结果与查询无关，让 Alfred 直接缓存，.env 修好后最多 30 秒生效
+        print(json.dumps(alfred.script_filter([error_item], cache_seconds=CONFIG_ERROR_CACHE)))
         return
 
     query_str = sys.argv[1] if len(sys.argv) > 1 else ""
@@ -137,34 +404,60 @@ def main():
     jql_core = " AND ".join(jql_clauses)
     final_jql = f"{jql_core} ORDER BY key DESC"
 
-    search_results = execute_acli_command(final_jql, paginate=should_paginate_all)
+    rerun = None
+    if should_paginate_all:
+        search_results, rerun = load_all_issues(final_jql)
+    else:
+        search_results = execute_acli_command(final_jql)
     alfred_items = []
 
     if isinstance(search_results, dict) and "error" in search_results:
         alfred_items.append(generate_alfred_item(title=f"Error: {search_results['error']}", subtitle=search_results['message'], arg="", uid="error"))
+    elif not search_results and rerun:
+        alfred_items.append(generate_alfred_item(title="Loading all issues…", subtitle="Fetching every page from Jira in the background.", arg="", uid="loading"))
     elif not search_results:
         alfred_items.append(generate_alfred_item(title="No Results Found", subtitle="Try adding --all to your search to load all pages.", arg="", uid="no-results"))
     else:
         count = len(search_results)
         subtitle_prefix = f"Loaded {count} issues."
-        if not should_paginate_all and count >= 50:
+        if rerun:
+            subtitle_prefix = f"Loaded {count} issues so far, fetching the rest…"
+        elif not should_paginate_all and count >= 50:
             subtitle_prefix += " (use --all to load more)"
 
-        for issue in search_results:
-            issue_key = issue.get("key", "N/A")
-            fields = issue.get("fields", {})
-            summary = fields.get("summary", "No Summary")
-            status_obj = fields.get("status", {})
-            status = status_obj.get("name", "No Status") if status_obj else "No Status"
-            
-            alfred_items.append(generate_alfred_item(
-                title=summary,
-                subtitle=f"{subtitle_prefix} | {issue_key} | {status}",
-                arg=f"{JIRA_BASE_URL}/browse/{issue_key}",
-                uid=issue_key
-            ))
+        # 常用的 issue 排在前面，同分时保持 ORDER BY key DESC
+        with timing.span('filter'):
+            usage = UsageLog(USAGE_LOG_PATH)
+
+            def issue_score(issue):
+                return match_score(search_terms, issue.get("key", ""), (issue.get("fields") or {}).get("summary") or "")
+
+            # --all 有上万条时整体排序每次按键要 20 多 ms：没用过、summary 也不含搜索词的 issue
+            # 分数都是最低的 1.0，排序后仍按原顺序排在最后，只对其余的排序
+            ranked, rest = [], []
+            for issue in search_results:
+                movable = issue.get("key", "") in usage.entries or (search_terms and issue_score(issue) > 1.0)
+                (ranked if movable else rest).append(issue)
+            search_results = usage.rank(ranked, key=lambda issue: issue.get("key", ""), match_score=issue_score) + rest
+
+        with timing.span('render'):
+            for issue in search_results:
+                issue_key = issue.get("key", "N/A")
+                fields = issue.get("fields", {})
+                summary = fields.get("summary", "No Summary")
+                status_obj = fields.get("status", {})
+                status = status_obj.get("name", "No Status") if status_obj else "No Status"
+                
+                alfred_items.append(generate_alfred_item(
+                    title=summary,
+                    subtitle=f"{subtitle_prefix} | {issue_key} | {status}",
+                    arg=f"{JIRA_BASE_URL}/browse/{issue_key}",
+                    uid=issue_key
+                ))
             
-    print(json.dumps({"items": alfred_items}))
+    with timing.span('render'):
+        print(json.dumps(alfred.script_filter(alfred_items, rerun=rerun)))
+    timing.flush(CACHE_DIR, 'acli', query_str)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,11 +1,12 @@
 # -*- coding: utf-8 -*-
 import sys
 import json
-import subprocess
 import os
 import time
-import urllib.parse
-import configparser
+import math
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+from common import alfred, timing
 
 # --- ++ 新增配置：可用的服务和Profile ++ ---
 # 在这里定义你的服务和Profile，以便脚本提供提示
@@ -19,7 +20,8 @@ AVAILABLE_SERVICES = {
     "role": " IAM Roles",
     "s3": " S3 buckets",
     "sqs": " SQS queues",
-    "his": " History of accessed resources"
+    "his": " History of accessed resources",
+    "*": " All services at once"
 }
 
 AVAILABLE_PROFILES = {
@@ -34,22 +36,64 @@ AVAILABLE_PROFILES = {
 # --- 配置 ---
 DEFAULT_REGION = "ap-northeast-1"
 CACHE_EXPIRY = 3600
+PREFETCH_TIMEOUT = 120
+PREFETCH_RETRY_DELAY = 60
+GLOBAL_RESULT_LIMIT = 100
+AWS_TIMEOUT = 60
+AWS_CONFIG_TIMEOUT = 5
 # ----------------
 
-try:
-    query_str = sys.argv[1]
-except IndexError:
-    query_str = ""
-
 CACHE_DIR = os.getenv('alfred_workflow_data', os.path.expanduser('~/.alfred_workflow_data'))
-if not os.path.exists(CACHE_DIR):
-    os.makedirs(CACHE_DIR)
+
+def load_env_file():
+    """Load environment variables from .env file"""
+    env_vars = {}
+    env_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env')
+
+    if os.path.exists(env_path):
+        with open(env_path, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#') and '=' in line:
+                    key, value = line.split('=', 1)
+                    env_vars[key.strip()] = value.strip()
+
+    return env_vars
+
+with timing.span('config'):
+    env_config = load_env_file()
+
+def env_int(name, default):
+    """.env 里的整数设置；写错（例如 5m）时在 stderr 警告并用默认值，不让 Script Filter 崩溃"""
+    value = env_config.get(name)
+    if not value:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        print(f"Ignoring {name}={value!r} in .env: not a whole number of seconds", file=sys.stderr)
+        return default
+
+# --- 自适应缓存时间 ---
+# 每次刷新把结果的摘要和上一次比较，按 (service, profile) 记录每个刷新间隔的长度和期间是否变化，
+# 把变化当作泊松过程估计变化率 λ，TTL 取缓存过期前数据已变化的概率为 STALE_TARGET 的时长
+# .env 里的 CACHE_TTL_<SERVICE>（例如 CACHE_TTL_EC2=300）固定该服务的 TTL
+CACHE_TTL_MIN = env_int('CACHE_TTL_MIN', 300)
+CACHE_TTL_MAX = env_int('CACHE_TTL_MAX', 86400)
+STALE_TARGET = 0.2
+TTL_DECAY = 0.9
+# 先验：两个长度为 ln2 * PRIOR_SECONDS 的间隔，一个变化一个没变，估计出的 λ = 1 / PRIOR_SECONDS，初始 TTL 就是 CACHE_EXPIRY
+PRIOR_SECONDS = CACHE_EXPIRY / -math.log(1 - STALE_TARGET)
+PRIOR_INTERVAL = math.log(2) * PRIOR_SECONDS
+MAX_INTERVALS = 40
 
 # --- 函数部分 ---
 def get_sso_start_url(profile):
     """
     Parses ~/.aws/config to find the sso_start_url for a given profile.
     """
+    import configparser
+
     config = configparser.ConfigParser()
     config_path = os.path.expanduser('~/.aws/config')
     if not os.path.exists(config_path):
@@ -76,50 +120,164 @@ def get_sso_start_url(profile):
     return None
 
 def get_region_for_profile(profile):
-    try:
-        region = subprocess.check_output(['aws', 'configure', 'get', 'region', '--profile', profile], text=True).strip()
-        return region
-    except subprocess.CalledProcessError:
-        return DEFAULT_REGION
+    """
+    查询 profile 的 region，结果缓存到文件，缓存命中时不再启动 aws 进程
+    """
+    region_file = os.path.join(CACHE_DIR, f"region_{profile}.txt")
+    with timing.span('config'):
+        if os.path.exists(region_file) and (time.time() - os.path.getmtime(region_file)) < CACHE_EXPIRY:
+            with open(region_file, 'r') as f: return f.read().strip() or DEFAULT_REGION
+
+        from common import executor
+        try:
+            region = executor.run_text(['aws', 'configure', 'get', 'region', '--profile', profile],
+                                       timeout=AWS_CONFIG_TIMEOUT).strip()
+        except executor.CommandError:
+            return DEFAULT_REGION
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(region_file, 'w') as f: f.write(region)
+    return region or DEFAULT_REGION
 
 def check_aws_credentials(profile):
     """
     快速检查 AWS 凭证是否有效
     使用 aws sts get-caller-identity 命令进行轻量级验证
     """
+    from common import executor
     try:
-        result = subprocess.run(
-            ['aws', 'sts', 'get-caller-identity', '--profile', profile], 
-            capture_output=True, text=True, timeout=5
-        )
-        return result.returncode == 0
-    except subprocess.TimeoutExpired:
-        return False
-    except Exception:
+        with timing.span('credentials'):
+            executor.run_text(['aws', 'sts', 'get-caller-identity', '--profile', profile], timeout=5)
+        return True
+    except executor.CommandError:
         return False
 
-def execute_aws_command(command, cache_key):
-    cache_file = os.path.join(CACHE_DIR, f"{cache_key}.json")
-    if os.path.exists(cache_file) and (time.time() - os.path.getmtime(cache_file)) < CACHE_EXPIRY:
-        with open(cache_file, 'r') as f: return json.load(f)
+def get_cache_key(service, profile, region):
+    return f"{service}_{profile}_{region or 'global'}"
+
+def get_ttl_file(service, profile):
+    return os.path.join(CACHE_DIR, f"ttl_{service}_{profile}.json")
+
+def load_ttl_stats(service, profile):
+    try:
+        with open(get_ttl_file(service, profile), 'r') as f: return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+def get_ttl(service, profile):
+    override = env_int(f"CACHE_TTL_{service.upper()}", None)
+    if override is not None:
+        return override
+    ttl = load_ttl_stats(service, profile).get("ttl", CACHE_EXPIRY)
+    return min(max(ttl, CACHE_TTL_MIN), CACHE_TTL_MAX)
+
+def estimate_change_rate(intervals):
+    """
+    区间删失的极大似然估计：只知道每个刷新间隔 Δ 内有没有变化，不知道变了几次
+    变化过的概率是 1 - e^(-λΔ)，对数似然对 λ 的导数单调递减，在对数刻度上二分求零点
+    """
+    def score(rate):
+        total = 0.0
+        for seconds, changed, weight in intervals:
+            if changed:
+                total += weight * seconds / math.expm1(min(rate * seconds, 700))
+            else:
+                total -= weight * seconds
+        return total
+
+    low, high = 1e-9, 1.0
+    for _ in range(50):
+        rate = math.sqrt(low * high)
+        if score(rate) > 0:
+            low = rate
+        else:
+            high = rate
+    return math.sqrt(low * high)
+
+def record_refresh(service, profile, digest):
+    """
+    刷新成功后记录这个刷新间隔：长度和摘要是否变化（一个间隔里变了几次看不出来，只算“变过”）
+    旧间隔的权重按 TTL_DECAY 衰减，资源的变化节奏改变后 TTL 能跟着调整
+    """
+    now = time.time()
+    stats = load_ttl_stats(service, profile)
+    intervals = stats.get("intervals") or [[PRIOR_INTERVAL, 1, 1.0], [PRIOR_INTERVAL, 0, 1.0]]
+    if "refreshed" in stats and now > stats["refreshed"]:
+        intervals = [[seconds, changed, weight * TTL_DECAY] for seconds, changed, weight in intervals]
+        intervals.append([now - stats["refreshed"], int(digest != stats.get("digest")), 1.0])
+        intervals = intervals[-MAX_INTERVALS:]
+
+    rate = estimate_change_rate(intervals)
+    ttl = -math.log(1 - STALE_TARGET) / rate
+    stats = {
+        "refreshed": now,
+        "digest": digest,
+        "intervals": intervals,
+        "changes_per_hour": round(rate * 3600, 4),
+        "ttl": int(min(max(ttl, CACHE_TTL_MIN), CACHE_TTL_MAX)),
+    }
+    ttl_file = get_ttl_file(service, profile)
+    with open(f"{ttl_file}.tmp", 'w') as f: json.dump(stats, f)
+    os.replace(f"{ttl_file}.tmp", ttl_file)
+
+def is_cache_fresh(service, profile, region):
+    cache_file = os.path.join(CACHE_DIR, f"{get_cache_key(service, profile, region)}.json")
+    return os.path.exists(cache_file) and (time.time() - os.path.getmtime(cache_file)) < get_ttl(service, profile)
+
+def get_projection(config):
+    """只保留 get_item_data / index_attrs 用到的字段，其余字段在读取管道时就丢掉"""
+    fields = config.get('fields')
+    if not fields:
+        return None
+    return lambda item: {field: item[field] for field in fields if field in item}
+
+# 本进程读到（或写入）的缓存版本 {cache_file: [mtime_ns, size]}，索引据此判断是否对应同一份数据
+loaded_versions = {}
+
+def file_version(f):
+    stat = os.fstat(f.fileno())
+    return [stat.st_mtime_ns, stat.st_size]
+
+def execute_aws_command(command, service, profile, region, project=None):
+    cache_file = os.path.join(CACHE_DIR, f"{get_cache_key(service, profile, region)}.json")
+    with timing.span('cache'):
+        if is_cache_fresh(service, profile, region):
+            timing.tag(cache='hit')
+            with open(cache_file, 'r') as f:
+                loaded_versions[cache_file] = file_version(f)
+                return json.load(f)
+    timing.tag(cache='miss')
+
+    from common import executor
     try:
-        result = subprocess.check_output(command, text=True, stderr=subprocess.PIPE)
-        data = json.loads(result)
-        with open(cache_file, 'w') as f: json.dump(data, f)
-        return data
-    except subprocess.CalledProcessError as e:
-        error_output = e.stderr.strip()
+        # 解析在读取管道时同步进行，fetch 包含了原来的 parse
+        with timing.span('fetch'):
+            data = executor.run_json(command, timeout=AWS_TIMEOUT, project=project)
+    except executor.CommandError as e:
+        error_output = e.message
         token_expired_patterns = [
             "Expired", "expired", "Token for", "does not exist",
             "Error loading SSO Token", "SSO session", "No credentials"
         ]
         
-        if any(pattern in error_output for pattern in token_expired_patterns):
+        if e.kind == executor.FAILED and any(pattern in error_output for pattern in token_expired_patterns):
             return {"error": "ExpiredToken", "message": error_output}
         else:
             return {"error": "AWSError", "message": error_output}
-    except json.JSONDecodeError: 
-        return None
+
+    import hashlib
+
+    with timing.span('cache'):
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        serialized = json.dumps(data)
+        # 先写临时文件再替换，读者拿到的要么是旧文件要么是完整的新文件
+        with open(f"{cache_file}.{os.getpid()}.tmp", 'w') as f:
+            f.write(serialized)
+            f.flush()
+            loaded_versions[cache_file] = file_version(f)
+        os.replace(f"{cache_file}.{os.getpid()}.tmp", cache_file)
+        record_refresh(service, profile, hashlib.md5(serialized.encode('utf-8')).hexdigest())
+    return data
 
 def generate_alfred_item(title, subtitle, arg, uid, mods=None, valid=True, autocomplete=None):
     item = {
@@ -248,37 +406,186 @@ def get_tag_name(tags):
         if tag.get('Key') == 'Name': return tag.get('Value', '')
     return ""
 
-def search_aws_resources(service, profile, region, search_str):
-    service_configs = {
+def get_tag_pairs(tags):
+    """所有 tag 作为 (key, value) 索引属性，Name 也可以用 name:xxx 查询"""
+    return [(tag['Key'].lower(), tag.get('Value')) for tag in tags or [] if tag.get('Key')]
+
+def quote_url(value):
+    import urllib.parse
+    return urllib.parse.quote(value, safe='')
+
+# --- 倒排索引：key -> value -> 资源在缓存列表中的位置 ---
+# 每个 key 单独存一个文件，查询 team:payments 时不需要读取 ip 这类很大的 posting
+INDEX_KEY_ALIASES = {'status': 'state', 'private-ip': 'ip', 'public-ip': 'ip', 'az': 'zone'}
+
+def build_index(items, index_attrs):
+    index = {}
+    for position, item in enumerate(items):
+        for key, value in index_attrs(item):
+            if value:
+                positions = index.setdefault(key, {}).setdefault(str(value).lower(), [])
+                if not positions or positions[-1] != position:
+                    positions.append(position)
+    return index
+
+def load_index_meta(cache_key):
+    try:
+        with open(os.path.join(CACHE_DIR, f"{cache_key}.idx.json"), 'r') as f: return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+def postings_file(cache_key, version, n):
+    """posting 文件名带上缓存版本，重建索引不会改写并发读者正在用的旧文件"""
+    return os.path.join(CACHE_DIR, f"{cache_key}.idx.{version[0]}-{version[1]}.{n}.json")
+
+def index_matches(meta, version, count):
+    return version is not None and meta.get('version') == version and meta.get('count') == count
+
+def ensure_index(cache_key, items, index_attrs):
+    """
+    索引和缓存放在一起，meta 里记下建索引时的缓存版本（mtime_ns, size）和条目数
+    和本进程读到的 items 对不上时重建：后台预取可能在读取和建索引之间改写了缓存，不能看文件 mtime
+    新版本的 posting 全部写好后才替换 meta，之后再删旧版本的文件
+    """
+    cache_file = os.path.join(CACHE_DIR, f"{cache_key}.json")
+    meta_file = os.path.join(CACHE_DIR, f"{cache_key}.idx.json")
+    version = loaded_versions.get(cache_file)
+    if index_matches(load_index_meta(cache_key), version, len(items)):
+        return
+
+    if version is None:
+        return
+
+    index = build_index(items, index_attrs)
+    keys = sorted(index)
+    written = set()
+    for n, key in enumerate(keys):
+        path = postings_file(cache_key, version, n)
+        with open(f"{path}.{os.getpid()}.tmp", 'w') as f: json.dump(index[key], f)
+        os.replace(f"{path}.{os.getpid()}.tmp", path)
+        written.add(os.path.basename(path))
+    with open(f"{meta_file}.{os.getpid()}.tmp", 'w') as f:
+        json.dump({'keys': keys, 'count': len(items), 'version': version}, f)
+    os.replace(f"{meta_file}.{os.getpid()}.tmp", meta_file)
+
+    # 旧版本的 posting：还拿着旧 meta 的读者打不开文件时会退回内存扫描
+    prefix = f"{cache_key}.idx."
+    for name in os.listdir(CACHE_DIR):
+        if name.startswith(prefix) and name.endswith('.json') and name not in written and name != os.path.basename(meta_file):
+            try:
+                os.remove(os.path.join(CACHE_DIR, name))
+            except FileNotFoundError:
+                pass
+
+def load_postings(cache_key, keys_needed, count):
+    """
+    返回索引中所有的 key 以及 keys_needed 对应的 posting
+    索引不是由本进程读到的那份缓存建的（另一个进程刚重建过）时返回 None，调用方改为在内存里扫描
+    """
+    version = loaded_versions.get(os.path.join(CACHE_DIR, f"{cache_key}.json"))
+    meta = load_index_meta(cache_key)
+    if not index_matches(meta, version, count):
+        return None
+    keys = meta['keys']
+    postings = {}
+    try:
+        for n, key in enumerate(keys):
+            if key in keys_needed:
+                with open(postings_file(cache_key, version, n), 'r') as f: postings[key] = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    if any(position >= count for values in postings.values() for positions in values.values() for position in positions):
+        return None
+    return keys, postings
+
+def looks_like_ip(term):
+    return term.count('.') >= 1 and term.replace('.', '').isdigit()
+
+def parse_search_terms(search_str):
+    """拆分出 key:value 过滤条件和普通搜索词，IP 形式的词按 ip:xxx 处理"""
+    filters, text_terms = [], []
+    for term in search_str.split():
+        key, sep, value = term.partition(':')
+        if sep and key and value:
+            filters.append((INDEX_KEY_ALIASES.get(key.lower(), key.lower()), value.lower(), term))
+        elif looks_like_ip(term):
+            filters.append(('ip', term, term))
+        else:
+            text_terms.append(term)
+    return filters, text_terms
+
+def resolve_filters(postings, filters):
+    """
+    各条件的位置集合求交集，value 没有精确匹配时按前缀匹配（方便边输入边过滤）
+    """
+    result = None
+    for key, value, _ in filters:
+        values = postings[key]
+        if value in values:
+            positions = set(values[value])
+        else:
+            positions = set()
+            for candidate, candidate_positions in values.items():
+                if candidate.startswith(value):
+                    positions.update(candidate_positions)
+        result = positions if result is None else result & positions
+        if not result:
+            return []
+    return sorted(result)
+
+def get_service_configs(profile, region):
+    return {
         'ec2': {
             'command': ['aws', 'ec2', 'describe-instances', '--profile', profile, '--region', region, '--query', 'Reservations[].Instances[]'],
+            'fields': ('InstanceId', 'Tags', 'State', 'PrivateIpAddress', 'PublicIpAddress', 'SubnetId', 'VpcId', 'InstanceType'),
             'url_template': f"https://{region}.console.aws.amazon.com/ec2/v2/home?region={region}#InstanceDetails:instanceId={{id}}",
             'extract_items': lambda data: data if data else [],
             'get_item_data': lambda item: {
                 'id': item.get('InstanceId', 'N/A'),
                 'name': get_tag_name(item.get('Tags', [])),
-                'extra_info': f"State: {item.get('State', {}).get('Name', 'N/A')}"
-            }
+                'extra_info': f"State: {item.get('State', {}).get('Name', 'N/A')} | IP: {item.get('PrivateIpAddress', 'N/A')}"
+            },
+            'index_attrs': lambda item: [
+                ('state', item.get('State', {}).get('Name')),
+                ('ip', item.get('PrivateIpAddress')),
+                ('ip', item.get('PublicIpAddress')),
+                ('subnet', item.get('SubnetId')),
+                ('vpc', item.get('VpcId')),
+                ('type', item.get('InstanceType')),
+            ] + get_tag_pairs(item.get('Tags'))
         },
         'rds': {
             'command': ['aws', 'rds', 'describe-db-instances', '--profile', profile, '--region', region, '--query', 'DBInstances[]'],
+            'fields': ('DBInstanceIdentifier', 'DBInstanceStatus', 'Engine', 'DBInstanceClass', 'DBSubnetGroup', 'AvailabilityZone'),
             'url_template': f"https://{region}.console.aws.amazon.com/rds/home?region={region}#database:id={{id}};is-cluster=false",
             'extract_items': lambda data: data if data else [],
             'get_item_data': lambda item: {
                 'id': item.get('DBInstanceIdentifier'),
                 'name': item.get('DBInstanceIdentifier'),
                 'extra_info': f"Status: {item.get('DBInstanceStatus')} | Engine: {item.get('Engine')}"
-            }
+            },
+            'index_attrs': lambda item: [
+                ('state', item.get('DBInstanceStatus')),
+                ('engine', item.get('Engine')),
+                ('class', item.get('DBInstanceClass')),
+                ('vpc', (item.get('DBSubnetGroup') or {}).get('VpcId')),
+                ('zone', item.get('AvailabilityZone')),
+            ] + [('subnet', subnet.get('SubnetIdentifier')) for subnet in (item.get('DBSubnetGroup') or {}).get('Subnets', [])]
         },
         'lambda': {
             'command': ['aws', 'lambda', 'list-functions', '--profile', profile, '--region', region, '--query', 'Functions[]'],
+            'fields': ('FunctionName', 'Runtime', 'VpcConfig'),
             'url_template': f"https://{region}.console.aws.amazon.com/lambda/home?region={region}#/functions/{{id}}?tab=code",
             'extract_items': lambda data: data if data else [],
             'get_item_data': lambda item: {
                 'id': item.get('FunctionName'),
                 'name': item.get('FunctionName'),
                 'extra_info': f"Runtime: {item.get('Runtime')}"
-            }
+            },
+            'index_attrs': lambda item: [
+                ('runtime', item.get('Runtime')),
+                ('vpc', (item.get('VpcConfig') or {}).get('VpcId')),
+            ] + [('subnet', subnet) for subnet in (item.get('VpcConfig') or {}).get('SubnetIds', [])]
         },
         'dynamo': {
             'command': ['aws', 'dynamodb', 'list-tables', '--profile', profile, '--region', region, '--query', 'TableNames[]'],
@@ -288,6 +595,7 @@ def search_aws_resources(service, profile, region, search_str):
         },
         'sfn': {
             'command': ['aws', 'stepfunctions', 'list-state-machines', '--profile', profile, '--region', region, '--query', 'stateMachines[]'],
+            'fields': ('stateMachineArn', 'name'),
             'url_template': f"https://{region}.console.aws.amazon.com/states/home?region={region}#/statemachines/view/{{id}}",
             'extract_items': lambda data: data if data else [],
             'get_item_data': lambda item: {
@@ -297,12 +605,14 @@ def search_aws_resources(service, profile, region, search_str):
         },
         'secret': {
             'command': ['aws', 'secretsmanager', 'list-secrets', '--profile', profile, '--region', region, '--query', 'SecretList[]'],
+            'fields': ('Name',),
             'url_template': f"https://{region}.console.aws.amazon.com/secretsmanager/secret?name={{id}}&region={region}",
             'extract_items': lambda data: data if data else [],
             'get_item_data': lambda item: { 'id': item.get('Name'), 'name': item.get('Name'), 'extra_info': f"Secret Name: {item.get('Name')}" }
         },
         'role': {
             'command': ['aws', 'iam', 'list-roles', '--profile', profile, '--query', 'Roles[]'],
+            'fields': ('RoleName', 'Path', 'CreateDate'),
             'url_template': f"https://console.aws.amazon.com/iam/home#/roles/{{id}}",
             'extract_items': lambda data: data if data else [],
             'get_item_data': lambda item: {
@@ -312,6 +622,7 @@ def search_aws_resources(service, profile, region, search_str):
         },
         's3': {
             'command': ['aws', 's3api', 'list-buckets', '--profile', profile, '--query', 'Buckets[]'],
+            'fields': ('Name', 'CreationDate'),
             'url_template': f"https://s3.console.aws.amazon.com/s3/buckets/{{id}}?region={region}&tab=objects",
             'extract_items': lambda data: data if data else [],
             'get_item_data': lambda item: {
@@ -326,17 +637,20 @@ def search_aws_resources(service, profile, region, search_str):
             'get_item_data': lambda item: {
                 'id': item, 'name': item.split('/')[-1] if item else 'N/A',
                 'extra_info': f"Queue URL: {item}",
-                'encoded_id': urllib.parse.quote(item, safe='') if item else ''
+                'encoded_id': quote_url(item) if item else ''
             }
         }
     }
+
+def search_aws_resources(service, profile, region, search_str):
+    service_configs = get_service_configs(profile, region)
     
     if service not in service_configs:
         return [generate_alfred_item(f"Service '{service}' not supported", "", service, service, False)]
     
     config = service_configs[service]
-    cache_key_region = region or "global"
-    data = execute_aws_command(config['command'], f"{service}_{profile}_{cache_key_region}")
+    cache_key = get_cache_key(service, profile, region)
+    data = execute_aws_command(config['command'], service, profile, region, get_projection(config))
     
     is_error, error_items = handle_aws_response(data, profile)
     if is_error:
@@ -346,43 +660,187 @@ def search_aws_resources(service, profile, region, search_str):
     if not items:
         return []
     
+    filters, text_terms = parse_search_terms(search_str) if 'index_attrs' in config else ([], [])
+    if 'index_attrs' in config:
+        with timing.span('index'):
+            ensure_index(cache_key, items, config['index_attrs'])
+    if filters:
+        with timing.span('index'):
+            keys_needed = {key for key, _, _ in filters}
+            loaded = load_postings(cache_key, keys_needed, len(items))
+            if loaded is None:
+                index = build_index(items, config['index_attrs'])
+                loaded = sorted(index), {key: index[key] for key in keys_needed if key in index}
+            known_keys, postings = loaded
+            # 只有索引里存在的 key 才当作过滤条件，其余仍按普通搜索词处理（例如 ARN）
+            text_terms += [term for key, _, term in filters if key not in postings]
+            filters = [f for f in filters if f[0] in postings]
+            if filters:
+                items = [items[position] for position in resolve_filters(postings, filters)]
+        search_str = " ".join(text_terms)
+
     results = []
-    for item in items:
-        item_data = config['get_item_data'](item)
+    with timing.span('filter'):
+        for item in items:
+            item_data = config['get_item_data'](item)
         
-        if search_str:
-            search_lower = search_str.lower()
-            if not (search_lower in (item_data['name'] or '').lower() or 
-                   search_lower in (item_data['id'] or '').lower()):
-                continue
+            if search_str:
+                search_lower = search_str.lower()
+                if not (search_lower in (item_data['name'] or '').lower() or 
+                       search_lower in (item_data['id'] or '').lower()):
+                    continue
         
-        title = f"{service.upper()}: {item_data['name'] or item_data['id']}"
-        destination_url = config['url_template'].format(**item_data, region=region)
-        open_arg = config.get('open_arg', destination_url)
+            title = f"{service.upper()}: {item_data['name'] or item_data['id']}"
+            destination_url = config['url_template'].format(**item_data, region=region)
+            open_arg = config.get('open_arg', destination_url)
         
-        log_arg = f"log_and_open::{open_arg}|{title}"
+            log_arg = f"log_and_open::{open_arg}|{title}"
         
-        mods = {
-            "cmd": {
-                "valid": True, "arg": destination_url,
-                "subtitle": "⌘ Hold Cmd+Enter to copy URL to clipboard"
+            mods = {
+                "cmd": {
+                    "valid": True, "arg": destination_url,
+                    "subtitle": "⌘ Hold Cmd+Enter to copy URL to clipboard"
+                }
             }
-        }
         
-        results.append(generate_alfred_item(
-            title=title,
-            subtitle=f"{item_data['extra_info']} | Press Enter to open",
-            arg=log_arg,
-            uid=item_data.get('id') or item_data.get('name') or destination_url,
-            mods=mods
-        ))
+            results.append(generate_alfred_item(
+                title=title,
+                subtitle=f"{item_data['extra_info']} | Press Enter to open",
+                arg=log_arg,
+                uid=item_data.get('id') or item_data.get('name') or destination_url,
+                mods=mods
+            ))
     
     return results
 
+# --- 全局搜索：* profile term ---
+def get_prefetch_status(profile):
+    status_file = os.path.join(CACHE_DIR, f"prefetch_{profile}.json")
+    if not os.path.exists(status_file):
+        return {}
+    try:
+        with open(status_file, 'r') as f: return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+def save_prefetch_status(profile, status):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    status_file = os.path.join(CACHE_DIR, f"prefetch_{profile}.json")
+    with open(f"{status_file}.tmp", 'w') as f: json.dump(status, f)
+    os.replace(f"{status_file}.tmp", status_file)
+
+def prefetch_services(profile, region, services):
+    """
+    后台进程：并发拉取多个服务的资源列表，各自写入缓存
+    总耗时取决于最慢的服务，而不是所有服务之和
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    service_configs = get_service_configs(profile, region)
+
+    def fetch(service):
+        config = service_configs[service]
+        return service, execute_aws_command(config['command'], service, profile, region, get_projection(config))
+
+    errors = {}
+    with ThreadPoolExecutor(max_workers=len(services)) as pool:
+        for service, data in pool.map(fetch, services):
+            if isinstance(data, dict) and "error" in data:
+                errors[service] = data
+
+    save_prefetch_status(profile, {"running": False, "finished": time.time(), "errors": errors})
+
+def start_prefetch(profile, region, services):
+    import subprocess
+
+    save_prefetch_status(profile, {"running": True, "started": time.time(), "services": services})
+    subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), '--prefetch', profile, region] + services,
+        stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        start_new_session=True
+    )
+
+def match_rank(search_str, name):
+    """全局搜索的排序分：完全匹配 > 前缀匹配 > 包含"""
+    if not search_str:
+        return 0
+    search_lower = search_str.lower()
+    name = name.lower()
+    if name == search_lower:
+        return 3
+    if name.startswith(search_lower):
+        return 2
+    return 1 if search_lower in name else 0
+
+def global_search(profile, search_str):
+    """
+    搜索 profile 下的所有服务，已缓存的服务立即返回，
+    未缓存的服务交给后台进程并发拉取，返回 rerun 让 Alfred 稍后重新执行
+    返回 (items, rerun)
+    """
+    region = get_region_for_profile(profile)
+    services = [service for service in AVAILABLE_SERVICES if service not in ('his', '*')]
+    cached = [service for service in services if is_cache_fresh(service, profile, region)]
+
+    status = get_prefetch_status(profile)
+    now = time.time()
+    running = status.get("running") and now - status.get("started", 0) < PREFETCH_TIMEOUT
+    # 刚失败过的服务不立即重试，直接显示错误
+    errors = {} if running or now - status.get("finished", 0) > PREFETCH_RETRY_DELAY else status.get("errors", {})
+    missing = [service for service in services if service not in cached and service not in errors]
+
+    if missing and not running:
+        start_prefetch(profile, region, missing)
+        running = True
+
+    results = []
+    for service in cached:
+        for item in search_aws_resources(service, profile, region, search_str):
+            if item.get("valid") is False:
+                continue
+            name = item["title"].split(": ", 1)[-1]
+            results.append((match_rank(search_str, name), item))
+    results.sort(key=lambda result: -result[0])
+    alfred_items = [item for _, item in results[:GLOBAL_RESULT_LIMIT]]
+
+    expired = [error for error in errors.values() if error.get("error") == "ExpiredToken"]
+    if expired:
+        alfred_items = handle_aws_response(expired[0], profile)[1] + alfred_items
+    for service, error in errors.items():
+        if error.get("error") != "ExpiredToken":
+            alfred_items.append(generate_alfred_item(
+                title=f"❌ {service.upper()}: AWS CLI Error",
+                subtitle=error.get("message", "Unknown error"),
+                arg="error", uid=f"error-{service}", valid=False
+            ))
+
+    if running:
+        pending = [service for service in services if service not in cached and service not in errors]
+        alfred_items.append(generate_alfred_item(
+            title=f"🔄 Loading {', '.join(s.upper() for s in pending)} from {profile}...",
+            subtitle=f"{len(cached)} of {len(services)} services searched, results update automatically",
+            arg="loading", uid="loading-status", valid=False
+        ))
+        return alfred_items, 0.5
+
+    if not alfred_items:
+        alfred_items.append(generate_alfred_item(
+            title="No resources found",
+            subtitle=f"No resources match your search in {profile} profile",
+            arg="no-resources", uid="no-resources", valid=False
+        ))
+    return alfred_items, None
+
 def main():
+    if len(sys.argv) > 3 and sys.argv[1] == '--prefetch':
+        prefetch_services(sys.argv[2], sys.argv[3], sys.argv[4:])
+        return
+
+    query_str = sys.argv[1] if len(sys.argv) > 1 else ""
     query_parts = query_str.split()
     num_parts = len(query_parts)
     alfred_items = []
+    rerun = None
 
     if num_parts > 0 and query_parts[0] == 'his':
         history_file = os.path.join(CACHE_DIR, "aws_history.log")
@@ -447,13 +905,15 @@ def main():
 
             if profile not in AVAILABLE_PROFILES:
                 alfred_items.append(generate_status_item("profile_not_found", profile=profile))
+            elif service == '*':
+                alfred_items, rerun = global_search(profile, search_str)
             else:
-                # 预检查 AWS 凭证状态
-                if not check_aws_credentials(profile):
+                region = get_region_for_profile(profile)
+                # 缓存有效时跳过凭证预检查，直接读缓存
+                if not is_cache_fresh(service, profile, region) and not check_aws_credentials(profile):
                     alfred_items.append(generate_status_item("credentials_invalid", profile=profile))
                 else:
                     # 获取实际资源数据
-                    region = get_region_for_profile(profile)
                     alfred_items = search_aws_resources(service, profile, region, search_str)
                     
                     # 如果没有资源数据，显示空结果提示
@@ -469,7 +929,9 @@ def main():
     if not alfred_items:
         alfred_items.append(generate_alfred_item("No Results", "No items match your query", query_str, query_str, False))
 
-    print(json.dumps({"items": alfred_items}))
+    with timing.span('render'):
+        print(json.dumps(alfred.script_filter(alfred_items, rerun=rerun)))
+    timing.flush(CACHE_DIR, 'awscli', query_str)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,7 +1,8 @@
 #!/bin/bash
 
 CACHE_DIR="${CACHE_DIR:-"$HOME/.cache/gh"}"
+DATA_DIR="${alfred_workflow_data:-"$HOME/.alfred_workflow_data_gh"}"
 
-rm -rf "$CACHE_DIR"
+rm -rf "$CACHE_DIR" "$DATA_DIR/repos.jsonl" "$DATA_DIR/full-sync" "$DATA_DIR/refresh.failed"
 
 echo -n "${CACHE_DIR}"
@@ -36,12 +36,49 @@ item=$(
 EOF
 )
 
-repos=$(gh api /user/repos --method GET \
-  -f sort=pushed \
-  --hostname "$API_HOST" \
-  --cache "$CACHE_USER_REPOS" \
-  --paginate \
-  --jq ".[] | $item" | grep -i "$query")
+INDEX="$DATA_DIR/repos.jsonl"
+FAILED="$DATA_DIR/refresh.failed"
+
+# A failed refresh is not retried for INDEX_RETRY_DELAY seconds
+recently_failed=0
+if [[ -f "$FAILED" ]] && (( $(date +%s) - $(date -r "$FAILED" +%s) < INDEX_RETRY_DELAY )); then
+  recently_failed=1
+fi
+
+# Keystrokes read the local index. Refreshing it never blocks the keystroke.
+if (( ! recently_failed )) && { [[ ! -s "$INDEX" ]] || (( $(date +%s) - $(date -r "$INDEX" +%s) > INDEX_REFRESH )); }; then
+  nohup ./refresh-index.sh > /dev/null 2>&1 &
+fi
+
+# Rank: exact name, name prefix, owner/name prefix or name substring, owner/name substring.
+# Ties keep the index order, i.e. most recently pushed first.
+rank='
+  .key as $full
+  | ($full | split("/") | last) as $name
+  | if $q == "" then 3
+    elif $name == $q or $full == $q then 0
+    elif ($name | startswith($q)) then 1
+    elif ($full | startswith($q)) or ($name | contains($q)) then 2
+    elif ($full | contains($q)) then 3
+    else null end'
+
+repos=""
+if [[ -s "$INDEX" ]]; then
+  # grep narrows the index cheaply; jq only ranks the candidate lines
+  if [[ -n "$query" ]]; then
+    candidates=(grep -iF -- "$query" "$INDEX")
+  else
+    candidates=(head -n 50 "$INDEX")
+  fi
+  repos=$("${candidates[@]}" | jq -c -s --arg q "$query" "
+    (\$q | ascii_downcase) as \$q
+    | map({rank: ($rank), repo: .})
+    | map(select(.rank != null))
+    | sort_by(.rank)
+    | .[:50]
+    | .[].repo
+    | $item")
+fi
 
 if [[ -z "$repos" ]]; then
   repos=$(gh api /search/repositories --method GET \
@@ -55,4 +92,11 @@ fi
 
 items=$(echo -n "$repos" | tr '\n', ',' | sed 's/,$//')
 
-echo -n "{\"items\":[$items]}"
+# Until the first index is built, ask Alfred to rerun so the results fill in.
+# Not after a failed refresh: the rerun would only repeat the search API call.
+rerun=""
+if [[ ! -s "$INDEX" ]] && (( ! recently_failed )); then
+  rerun=',"rerun":1'
+fi
+
+echo -n "{\"items\":[$items]$rerun}"
@@ -0,0 +1,76 @@
+#!/bin/bash
+
+# Refresh the local repository index used by gh.sh.
+#
+# The index is one JSON object per line, newest push first. An incremental
+# refresh walks /user/repos sorted by pushed_at and stops at the first page
+# that reaches the newest entry already indexed. A full refresh, which also
+# drops deleted repositories, runs every INDEX_FULL_REFRESH seconds. When the
+# API call fails, refresh.failed records the time so gh.sh waits
+# INDEX_RETRY_DELAY seconds before starting another refresh.
+
+source ./setup.sh
+
+INDEX="$DATA_DIR/repos.jsonl"
+LOCK="$DATA_DIR/refresh.lock"
+FULL_SYNC="$DATA_DIR/full-sync"
+FAILED="$DATA_DIR/refresh.failed"
+PER_PAGE=100
+
+mkdir -p "$DATA_DIR"
+
+# mkdir is atomic, so only one refresh runs at a time. A lock older than 10 minutes is stale.
+if ! mkdir "$LOCK" 2>/dev/null; then
+  if (( $(date +%s) - $(date -r "$LOCK" +%s) < 600 )); then
+    exit 0
+  fi
+  rm -rf "$LOCK"
+  mkdir "$LOCK" || exit 0
+fi
+
+tmp="$INDEX.$$"
+trap 'rm -rf "$LOCK" "$tmp" "$tmp.merged"' EXIT
+
+# key is the lowercased full_name, precomputed because ascii_downcase is slow in jq 1.6
+fields='{id, full_name, html_url, ssh_url, clone_url, pushed_at, key: (.full_name | ascii_downcase)}'
+full=1
+last_seen=""
+if [[ -s "$INDEX" && -f "$FULL_SYNC" ]] && (( $(date +%s) - $(date -r "$FULL_SYNC" +%s) < INDEX_FULL_REFRESH )); then
+  full=0
+  last_seen=$(head -n 1 "$INDEX" | jq -r '.pushed_at // ""')
+fi
+
+page=1
+while :; do
+  batch=$(gh api /user/repos --method GET \
+    -f sort=pushed \
+    -f direction=desc \
+    -F per_page=$PER_PAGE \
+    -F page=$page \
+    --hostname "$API_HOST" \
+    --jq ".[] | $fields") || { touch "$FAILED"; exit 1; }
+
+  [[ -z "$batch" ]] && break
+  echo "$batch" >> "$tmp"
+
+  # Everything past the newest indexed push is already in the index
+  if (( ! full )) && echo "$batch" | jq -e --arg seen "$last_seen" 'select(.pushed_at <= $seen)' > /dev/null; then
+    break
+  fi
+  if (( $(echo "$batch" | wc -l) < PER_PAGE )); then
+    break
+  fi
+  page=$((page + 1))
+done
+
+if (( full )); then
+  touch "$tmp"
+  mv "$tmp" "$INDEX"
+  touch "$FULL_SYNC"
+else
+  # Fresh records come first, so group_by keeps them over the indexed copy
+  cat "$tmp" "$INDEX" \
+    | jq -c -s 'group_by(.id) | map(.[0]) | sort_by(.pushed_at) | reverse | .[]' > "$tmp.merged" \
+    && mv "$tmp.merged" "$INDEX"
+fi
+rm -f "$FAILED"
@@ -29,8 +29,11 @@ fi
 export API_HOST=${API_HOST:-github.com}
 export CACHE_PULLS=${CACHE_PULLS:-10m}
 export CACHE_SEARCH_REPOS=${CACHE_SEARCH_REPOS:-24h}
-export CACHE_USER_REPOS=${CACHE_USER_REPOS:-72h}
 export CHROME_PROFILE=${CHROME_PROFILE:-Default}
+export DATA_DIR=${alfred_workflow_data:-"$HOME/.alfred_workflow_data_gh"}
+export INDEX_REFRESH=${INDEX_REFRESH:-600}
+export INDEX_FULL_REFRESH=${INDEX_FULL_REFRESH:-604800}
+export INDEX_RETRY_DELAY=${INDEX_RETRY_DELAY:-300}
 
 if ! command -v gh &> /dev/null; then
   open "https://github.com/edgarjs/github-repos-alfred-workflow/blob/master/README.md"
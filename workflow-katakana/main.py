@@ -3,57 +3,98 @@
 
 import sys
 import json
-import urllib.parse
-import urllib.request
-from urllib.error import URLError
 import re
 import os
 import time
 import hashlib
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+from common import alfred, timing
+import normalize
+
 # 缓存配置
 # 缓存永不过期
 CACHE_DIR = os.getenv('alfred_workflow_data', os.path.expanduser('~/.alfred_workflow_data_kata'))
-if not os.path.exists(CACHE_DIR):
-    os.makedirs(CACHE_DIR)
+# 基准测试时指向本地 stub
+JISHO_API_URL = os.getenv('JISHO_API_URL', 'https://jisho.org/api/v1/search/words')
+# 后台查询 Jisho 期间 Alfred 重跑的间隔，以及查询超时和失败后重试的时间
+LOOKUP_RERUN = 0.3
+LOOKUP_TIMEOUT = 30
+LOOKUP_RETRY_DELAY = 300
+
+def fetch_jisho(url):
+    """请求 Jisho API，网络模块只在缓存未命中时才导入"""
+    import urllib.request
+
+    req = urllib.request.Request(
+        url,
+        headers={
+            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
+        }
+    )
+    # 本次查询发出过网络请求就算未命中，即使另一页来自缓存
+    timing.tag(cache='miss')
+    with timing.span('fetch'):
+        with urllib.request.urlopen(req, timeout=10) as response:
+            body = response.read().decode('utf-8')
+    with timing.span('parse'):
+        return json.loads(body)
+
+def load_cache(cache_file):
+    """读取缓存，缓存永不过期，未命中返回 None"""
+    with timing.span('cache'):
+        if os.path.exists(cache_file):
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+    return None
+
+def save_cache(cache_file, data):
+    with timing.span('cache'):
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(cache_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+
+def cache_path(word, page=1):
+    """word 是 normalize 之后的规范形式，第一页沿用不带页码的缓存键"""
+    key = word if page == 1 else f"{word}_page_{page}"
+    return os.path.join(CACHE_DIR, f"{hashlib.md5(key.encode('utf-8')).hexdigest()}.json")
+
+def resolve(query):
+    """
+    查询词 → 缓存用的规范形式：完全一致的缓存 > 别名 > 已缓存的单数形式 > 规范化后的查询词本身
+    复数命中单数缓存时记为别名，之后直接走别名
+    """
+    text = normalize.normalize(query)
+    if not text or os.path.exists(cache_path(text)):
+        return text
+    aliases = normalize.load_aliases(CACHE_DIR)
+    if text in aliases:
+        return aliases[text]
+    for lemma in normalize.plural_lemmas(text):
+        if os.path.exists(cache_path(lemma)):
+            normalize.save_alias(CACHE_DIR, text, lemma)
+            return lemma
+    return text
 
 def jisho_search(word):
     """使用 Jisho API 搜索单词，带缓存功能"""
-    # 创建缓存键
-    cache_key = hashlib.md5(word.encode('utf-8')).hexdigest()
-    cache_file = os.path.join(CACHE_DIR, f"{cache_key}.json")
+    cache_file = cache_path(word)
     
     # 检查缓存，永不过期
-    if os.path.exists(cache_file):
-        print(f"DEBUG: Loading from cache for '{word}'", file=sys.stderr)
-        with open(cache_file, 'r', encoding='utf-8') as f:
-            return json.load(f)
+    cached = load_cache(cache_file)
+    if cached is not None:
+        return cached
     
     try:
-        url = "https://jisho.org/api/v1/search/words?keyword=" + urllib.parse.quote(word)
-        
-        req = urllib.request.Request(
-            url,
-            headers={
-                'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
-            }
-        )
+        import urllib.parse
+        url = f"{JISHO_API_URL}?keyword={urllib.parse.quote(word)}"
         
-        print(f"DEBUG: Fetching from Jisho API for '{word}'", file=sys.stderr)
-        start_time = time.time()
+        result = fetch_jisho(url)
         
-        with urllib.request.urlopen(req, timeout=10) as response:
-            data = response.read().decode('utf-8')
-            result = json.loads(data)
-            
-            end_time = time.time()
-            print(f"DEBUG: API request completed in {end_time - start_time:.3f} seconds", file=sys.stderr)
-            
-            if result and result.get('data'):
-                # 保存到缓存
-                with open(cache_file, 'w', encoding='utf-8') as f:
-                    json.dump(result['data'], f, ensure_ascii=False, indent=2)
-                return result['data']
+        if result and result.get('data'):
+            # 保存到缓存
+            save_cache(cache_file, result['data'])
+            return result['data']
                 
         return None
         
@@ -94,38 +135,25 @@ def should_fetch_next_page(data, search_word, has_exact_match):
     # 如果高优先级条目少于5个，需要翻页
     return high_priority_count < 5
 
-def jisho_search_with_pagination(word, page=1):
-    """使用 Jisho API 搜索单词，支持分页"""
-    cache_key = hashlib.md5(f"{word}_page_{page}".encode('utf-8')).hexdigest()
-    cache_file = os.path.join(CACHE_DIR, f"{cache_key}.json")
+def jisho_search_with_pagination(word, page=1, fetch=True):
+    """使用 Jisho API 搜索单词，支持分页；fetch=False 时只读缓存"""
+    cache_file = cache_path(word, page)
 
-    # 检查缓存，永不过期
-    if os.path.exists(cache_file):
-        print(f"DEBUG: Loading from cache for '{word}' page {page}", file=sys.stderr)
-        with open(cache_file, 'r', encoding='utf-8') as f:
-            return json.load(f)
+    # 检查缓存，永不过期；空列表也是缓存，表示这一页已经确认没有结果
+    cached = load_cache(cache_file)
+    if cached is not None or not fetch:
+        return cached or None
 
     try:
-        url = f"https://jisho.org/api/v1/search/words?keyword={urllib.parse.quote(word)}&page={page}"
-        
-        req = urllib.request.Request(
-            url,
-            headers={
-                'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36'
-            }
-        )
+        import urllib.parse
+        url = f"{JISHO_API_URL}?keyword={urllib.parse.quote(word)}&page={page}"
         
-        print(f"DEBUG: Fetching from Jisho API for '{word}' page {page}", file=sys.stderr)
+        result = fetch_jisho(url)
         
-        with urllib.request.urlopen(req, timeout=10) as response:
-            data = response.read().decode('utf-8')
-            result = json.loads(data)
-            
-            if result and result.get('data'):
-                # 保存到缓存
-                with open(cache_file, 'w', encoding='utf-8') as f:
-                    json.dump(result['data'], f, ensure_ascii=False, indent=2)
-                return result['data']
+        if result and 'data' in result:
+            # 空结果也写缓存，之后不再请求这一页
+            save_cache(cache_file, result['data'])
+            return result['data'] or None
                 
         return None
         
@@ -133,15 +161,16 @@ def jisho_search_with_pagination(word, page=1):
         print(f"Jisho API 错误 (page {page}): {str(e)}", file=sys.stderr)
         return None
 
-def main(query):
-    """主函数"""
-    start_total_time = time.time()
-    
+def lookup(query, fetch=True):
+    """
+    查询 Jisho，第一页没有音译词时再取第二页，返回条目列表
+    前台传 fetch=False：第二页只读后台写好的缓存，不在按键路径上请求网络
+    每次查询只记一个 cache 标签：先记 hit，fetch_jisho 真正请求时改成 miss
+    """
+    timing.tag(cache='hit')
     data = jisho_search(query)
-    
     if not data:
-        print(json.dumps({"items": [{"title": "Not Found", "subtitle": "No results for '{}'".format(query)}]}))
-        return
+        return data
 
     # 检查第一页是否有精确匹配（音译词汇）
     has_exact_match = False
@@ -178,25 +207,128 @@ def main(query):
     # 根据情况决定是否获取下一页
     if should_fetch_next_page(data, query, has_exact_match):
         print(f"DEBUG: Fetching next page for '{query}'", file=sys.stderr)
-        next_page_data = jisho_search_with_pagination(query, page=2)
+        next_page_data = jisho_search_with_pagination(query, page=2, fetch=fetch)
         if next_page_data:
             data.extend(next_page_data)
+    return data
+
+def lookup_markers(query):
+    """后台查询的状态文件：.lock 表示查询中，.failed 表示没查到或网络不通"""
+    base = os.path.join(CACHE_DIR, hashlib.md5(query.encode('utf-8')).hexdigest())
+    return f"{base}.lock", f"{base}.failed"
+
+def marker_age(path):
+    try:
+        return time.time() - os.path.getmtime(path)
+    except OSError:
+        return None
+
+def background_lookup(query):
+    """后台进程：查询 Jisho 写入缓存，结束后清掉 .lock，失败时留下 .failed"""
+    pending, failed = lookup_markers(query)
+    try:
+        data = lookup(query)
+        # 复数形式在 Jisho 上查不到时改查单数，查到后记为别名；aliases.txt 里固定的词不拆
+        if not data and normalize.load_aliases(CACHE_DIR).get(query) != query:
+            for lemma in normalize.plural_lemmas(query):
+                data = lookup(lemma)
+                if data:
+                    normalize.save_alias(CACHE_DIR, query, lemma)
+                    break
+        if data:
+            if os.path.exists(failed):
+                os.remove(failed)
+        else:
+            with open(failed, 'w') as f:
+                f.write(query)
+    finally:
+        os.remove(pending)
+
+def start_background_lookup(query):
+    import subprocess
+
+    pending, _ = lookup_markers(query)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(pending, 'w') as f:
+        f.write(query)
+    subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), '--lookup', query],
+        stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        start_new_session=True
+    )
+
+def offline_results(query):
+    """
+    Jisho 结果还没缓存时，先用本地音译规则给出一个临时结果，Jisho 查询放到后台
+    返回 (items, rerun)
+    """
+    import translit
+
+    pending, failed = lookup_markers(query)
+    pending_age, failed_age = marker_age(pending), marker_age(failed)
+    if pending_age is not None and pending_age < LOOKUP_TIMEOUT:
+        subtitle, rerun = "Offline guess, looking up jisho.org…", LOOKUP_RERUN
+    elif failed_age is not None and failed_age < LOOKUP_RETRY_DELAY:
+        subtitle, rerun = "Offline guess, jisho.org has no result or is unreachable", None
+    else:
+        start_background_lookup(query)
+        subtitle, rerun = "Offline guess, looking up jisho.org…", LOOKUP_RERUN
+
+    with timing.span('translit'):
+        reading = translit.transliterate(query)
+    if not reading:
+        return [{"title": "Not Found", "subtitle": "No results for '{}'".format(query)}], rerun
+    return [{
+        "title": reading,
+        "subtitle": subtitle,
+        "arg": reading,
+        "text": {
+            "copy": reading,
+            "largetype": reading
+        }
+    }], rerun
+
+def main(query):
+    """主函数"""
+    with timing.span('cache'):
+        term = resolve(query)
+    if not term:
+        print(json.dumps({"items": [{"title": "请输入英文单词进行查询"}]}))
+        return
+
+    pending, _ = lookup_markers(term)
+    # 没有缓存或后台还在查询（第二页可能还没写完）时，不阻塞等待网络
+    if not os.path.exists(cache_path(term)) or os.path.exists(pending):
+        timing.tag(cache='miss')
+        items, rerun = offline_results(term)
+        with timing.span('render'):
+            print(json.dumps(alfred.script_filter(items, rerun=rerun)))
+        timing.flush(CACHE_DIR, 'katakana', query)
+        return
+
+    data = lookup(term, fetch=False)
+
+    if not data:
+        print(json.dumps({"items": [{"title": "Not Found", "subtitle": "No results for '{}'".format(query)}]}))
+        timing.flush(CACHE_DIR, 'katakana', query)
+        return
 
     items = []
     seen_readings = set()
     
     # 增加排序逻辑：精确匹配的条目优先
-    sorted_data = sorted(data, key=lambda entry: (
-        not (
-            is_katakana_reading(entry.get('japanese', [{}])[0].get('reading', '')) and
-            not entry.get('japanese', [{}])[0].get('word') and
-            any(
-                query.lower() == definition.lower() or definition.lower().startswith(query.lower())
-                for definition in entry.get('senses', [{}])[0].get('english_definitions', [])
-            )
-        ),
-        # 其他排序条件可以加在这里
-    ))
+    with timing.span('filter'):
+        sorted_data = sorted(data, key=lambda entry: (
+            not (
+                is_katakana_reading(entry.get('japanese', [{}])[0].get('reading', '')) and
+                not entry.get('japanese', [{}])[0].get('word') and
+                any(
+                    term == definition.lower() or definition.lower().startswith(term)
+                    for definition in entry.get('senses', [{}])[0].get('english_definitions', [])
+                )
+            ),
+            # 其他排序条件可以加在这里
+        ))
 
     for entry in sorted_data:
         if not entry.get('japanese'):
@@ -235,13 +367,14 @@ def main(query):
     if not items:
         items.append({"title": "No Katakana Found", "subtitle": "Could not find a Katakana reading for '{}'".format(query)})
 
-    print(json.dumps({"items": items}))
-    
-    end_total_time = time.time()
-    print(f"DEBUG: Total execution time: {end_total_time - start_total_time:.3f} seconds", file=sys.stderr)
+    with timing.span('render'):
+        print(json.dumps({"items": items}))
+    timing.flush(CACHE_DIR, 'katakana', query)
 
 if __name__ == '__main__':
-    if len(sys.argv) > 1:
+    if len(sys.argv) > 2 and sys.argv[1] == '--lookup':
+        background_lookup(sys.argv[2])
+    elif len(sys.argv) > 1:
         main(sys.argv[1])
     else:
         print(json.dumps({"items": [{"title": "请输入英文单词进行查询"}]}))
@@ -0,0 +1,99 @@
+"""Query normalisation for the Jisho cache.
+
+Jisho's English search ignores case and surrounding whitespace, so queries
+are NFKC-normalised, case-folded and whitespace-collapsed before they become
+cache keys. Plural forms fall back to their singular through an alias map.
+Only plurals are stemmed: Japanese borrows -ing forms as words of their own
+(ランニング, ミーティング), so running must not become run.
+
+The alias map is aliases.txt in the workflow (reviewed entries, including
+`word = word` pins for plurals that are loanwords themselves, like news or
+jeans) plus aliases.json in the data directory, which main.py fills in as
+variants resolve to a cached singular.
+"""
+import json
+import os
+
+BUNDLED_ALIASES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'aliases.txt')
+ALIASES_FILE = 'aliases.json'
+MIN_STEM = 3
+
+# 复数规则：(复数后缀, 候选单数后缀)，取第一条匹配的后缀，候选按可能性排序
+# ies 既可能是 y（batteries）也可能是 ie（cookies），ses 可能是 bus 也可能是 case
+PLURAL_SUFFIXES = [
+    ('ies', ('y', 'ie')),
+    ('sses', ('ss',)),
+    ('ches', ('ch', 'che')),
+    ('shes', ('sh',)),
+    ('ses', ('s', 'se')),
+    ('xes', ('x',)),
+    ('zes', ('z', 'ze')),
+    ('oes', ('o', 'oe')),
+    ('s', ('',)),
+]
+# -ics、-ss、-us、-is 结尾的词不是复数（graphics, glass, bus, analysis）
+NOT_PLURAL = ('ics', 'ss', 'us', 'is')
+
+
+def normalize(query):
+    """Cache key form of a query: NFKC, case-folded, single spaces"""
+    # 全角字母等只出现在非 ASCII 输入里，unicodedata 只在这时导入
+    if not query.isascii():
+        import unicodedata
+        query = unicodedata.normalize('NFKC', query)
+    return ' '.join(query.casefold().split())
+
+
+def plural_lemmas(text):
+    """Candidate singulars of the last word, most likely first; empty if it does not look plural"""
+    head, _, word = text.rpartition(' ')
+    if word.endswith(NOT_PLURAL):
+        return []
+    lemmas = []
+    for suffix, replacements in PLURAL_SUFFIXES:
+        if not word.endswith(suffix):
+            continue
+        for replacement in replacements:
+            stem = word[:-len(suffix)] + replacement
+            if len(stem) >= MIN_STEM:
+                lemma = f"{head} {stem}" if head else stem
+                if lemma not in lemmas:
+                    lemmas.append(lemma)
+        break
+    return lemmas
+
+
+def load_aliases(data_dir):
+    """{variant: canonical} from aliases.txt, overridden by what was learned in data_dir"""
+    aliases = {}
+    try:
+        with open(BUNDLED_ALIASES_PATH, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.split('#', 1)[0]
+                if '=' in line:
+                    variant, canonical = line.split('=', 1)
+                    aliases[normalize(variant)] = normalize(canonical)
+    except OSError:
+        pass
+    try:
+        with open(os.path.join(data_dir, ALIASES_FILE), 'r', encoding='utf-8') as f:
+            aliases.update(json.load(f))
+    except (OSError, ValueError):
+        pass
+    return aliases
+
+
+def save_alias(data_dir, variant, canonical):
+    path = os.path.join(data_dir, ALIASES_FILE)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            learned = json.load(f)
+    except (OSError, ValueError):
+        learned = {}
+    if learned.get(variant) == canonical:
+        return
+    learned[variant] = canonical
+    os.makedirs(data_dir, exist_ok=True)
+    with open(f"{path}.{os.getpid()}.tmp", 'w', encoding='utf-8') as f:
+        json.dump(learned, f, ensure_ascii=False)
+    os.replace(f"{path}.{os.getpid()}.tmp", path)
@@ -0,0 +1,257 @@
+"""Offline English → katakana transliteration.
+
+Used as a provisional answer while jisho.org is queried or unreachable. A
+word is turned into ARPAbet phonemes, from pronunciations.txt when it is
+listed there and from spelling rules otherwise, then the phonemes are written
+in katakana following the usual loanword conventions: a vowel after every
+consonant except n, long vowels as ー, a small ッ before a word-final stop
+after a short vowel.
+
+The pronunciation table records how Japanese borrowed a word rather than how
+it is said in English (coffee is K AO HH IY). Vowels without a clear quality
+take their colour from the spelling, which is what loanwords do as well.
+"""
+import os
+import re
+
+PRONUNCIATIONS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pronunciations.txt')
+
+VOWELS = {'AA', 'AE', 'AH', 'AO', 'AW', 'AY', 'EH', 'ER', 'EY', 'IH', 'IY', 'OW', 'OY', 'UH', 'UW'}
+SHORT_VOWELS = {'AA', 'AE', 'AH', 'EH', 'IH', 'UH'}
+GEMINATE_STOPS = {'P', 'T', 'K', 'D', 'G', 'CH', 'JH'}
+
+# 拼写规则：在每个位置按顺序取第一条匹配的规则
+# 音素写成 "AA:o" 时，o 是决定元音写法的拼写字母
+SPELLING_RULES = [(re.compile(pattern), phonemes.split()) for pattern, phonemes in [
+    (r'^kn', 'N'), (r'^wr', 'R'), (r'^ps', 'S'),
+    (r'tch', 'Q CH'), (r'dge', 'Q JH'),
+    (r'(?<=s)sion', 'SH AH:o N'), (r'sion', 'ZH AH:o N'), (r'tion', 'SH AH:o N'),
+    (r'ture', 'CH ER'), (r'sure', 'ZH ER'),
+    (r'ph', 'F'), (r'th', 'TH'), (r'sh', 'SH'), (r'ch', 'CH'), (r'ck(?=[aeiouy])', 'K'), (r'ck', 'Q K'),
+    (r'ng(?![aeiouy])', 'NG'), (r'nk', 'NG K'), (r'qu', 'K W'), (r'wh', 'W'),
+    (r'gh(?=t|$)', ''), (r'x', 'K S'),
+    (r'cc(?=[eiy])', 'Q K S'), (r'cc', 'Q K'), (r'c(?=[eiy])', 'S'), (r'c', 'K'),
+    (r'gg(?=[aeiouy])', 'G'), (r'gg', 'Q G'), (r'g(?=[eiy])', 'JH'), (r'g', 'G'),
+    (r'pp', 'Q P'), (r'tt', 'Q T'), (r'dd', 'Q D'), (r'bb', 'B'),
+    (r'll', 'L'), (r'ss', 'S'), (r'ff', 'F'), (r'mm', 'M'), (r'nn', 'N'), (r'rr', 'R'), (r'zz', 'Z'),
+    (r'eigh', 'EY'), (r'igh', 'AY'), (r'air', 'EH AE'), (r'ore$', 'AA:o AE'), (r'ower', 'AE W ER'),
+    (r'ea(?=d|lth|th|ther)', 'EH'), (r'(?<=^[a-z])ie$', 'AY'),
+    (r'ee', 'IY'), (r'ea', 'IY'), (r'ie', 'IY'),
+    (r'oo(?=k)', 'UH Q'), (r'oo', 'UW'), (r'ou(?=p)', 'UW'), (r'ou', 'AW'),
+    (r'ow$', 'OW'), (r'ow', 'AW'), (r'o[iy]', 'OY'), (r'a[iy]', 'EY'), (r'a[uw]', 'AO'),
+    (r'ey$', 'IY'), (r'ey', 'EY'), (r'e[wu]', 'Y UW'), (r'ui', 'UW'), (r'ue$', 'UW'), (r'oa', 'OW'),
+    (r'(?<=[aeiou][^aeiou])or$', 'ER'), (r'(?<=[aeiou][^aeiou][^aeiou])or$', 'ER'),
+    (r'ar(?![aeiour])', 'AA R'), (r'or(?![aeiour])', 'AO R'), (r'[eiu]r(?![aeiour])', 'ER'),
+    (r'a(?=ll)', 'AO'), (r'(?<=w)a(?![iy])', 'AA:o'),
+    (r'a(?=tion)', 'EY'), (r'a(?=[^aeiou]es?$)', 'EY'), (r'e(?=[^aeiou]es?$)', 'IY'), (r'[iy](?=[^aeiou]es?$)', 'AY'),
+    (r'o(?=[^aeiou]es?$)', 'OW'), (r'u(?=[^aeiou]es?$)', 'Y UW'), (r'a(?=[bcdfgkpt]le$)', 'EY'),
+    (r'(?<=[^aeiou])e$', ''), (r'(?<=[^aeious])es$', 'Z'),
+    (r'u(?=[^aeiour][aeiouy])', 'Y UW'), (r'^o(?=[^aeiour][aeiouy])', 'OW'),
+    (r'^y(?=[aeiou])', 'Y'), (r'[iy]$', 'IY'), (r'y', 'IH'),
+    (r'a', 'AE'), (r'e', 'EH'), (r'i', 'IH'), (r'o', 'AA'), (r'u', 'AH'),
+    (r's(?=e$)', 'S'), (r'(?<=[aeiou])s(?=[aeiouy])', 'Z'),
+    (r'b', 'B'), (r'd', 'D'), (r'f', 'F'), (r'h', 'HH'), (r'j', 'JH'), (r'k', 'K'), (r'l', 'L'),
+    (r'm', 'M'), (r'n', 'N'), (r'p', 'P'), (r'q', 'K'), (r'r', 'R'), (r's', 'S'), (r't', 'T'),
+    (r'v', 'V'), (r'w', 'W'), (r'z', 'Z'),
+]]
+
+COLUMNS = 'aiueo'
+SYLLABLES = {
+    '': 'アイウエオ', 'K': 'カキクケコ', 'G': 'ガギグゲゴ', 'S': 'サシスセソ', 'Z': 'ザジズゼゾ',
+    'TH': 'サシスセソ', 'DH': 'ザジズゼゾ', 'N': 'ナニヌネノ', 'HH': 'ハヒフヘホ', 'B': 'バビブベボ',
+    'V': 'バビブベボ', 'P': 'パピプペポ', 'M': 'マミムメモ', 'R': 'ラリルレロ', 'L': 'ラリルレロ',
+}
+# 一个假名写不下的音节
+COMPOUND_SYLLABLES = {
+    'T': ('タ', 'ティ', 'トゥ', 'テ', 'ト'), 'D': ('ダ', 'ディ', 'ドゥ', 'デ', 'ド'),
+    'F': ('ファ', 'フィ', 'フ', 'フェ', 'フォ'), 'W': ('ワ', 'ウィ', 'ウ', 'ウェ', 'ウォ'),
+    'Y': ('ヤ', 'イ', 'ユ', 'イェ', 'ヨ'), 'SH': ('シャ', 'シ', 'シュ', 'シェ', 'ショ'),
+    'CH': ('チャ', 'チ', 'チュ', 'チェ', 'チョ'), 'JH': ('ジャ', 'ジ', 'ジュ', 'ジェ', 'ジョ'),
+    'ZH': ('ジャ', 'ジ', 'ジュ', 'ジェ', 'ジョ'), 'NG': ('ンガ', 'ンギ', 'ング', 'ンゲ', 'ンゴ'),
+}
+SMALL_GLIDES = {'a': 'ャ', 'u': 'ュ', 'e': 'ェ', 'o': 'ョ'}
+CODAS = {
+    'B': 'ブ', 'CH': 'チ', 'D': 'ド', 'DH': 'ズ', 'F': 'フ', 'G': 'グ', 'HH': '', 'JH': 'ジ', 'K': 'ク',
+    'L': 'ル', 'M': 'ム', 'N': 'ン', 'NG': 'ング', 'P': 'プ', 'S': 'ス', 'SH': 'シュ', 'T': 'ト',
+    'TH': 'ス', 'V': 'ブ', 'W': 'ウ', 'Y': 'イ', 'Z': 'ズ', 'ZH': 'ジュ',
+}
+
+_pronunciations = None
+
+
+def load_pronunciations(path=PRONUNCIATIONS_PATH):
+    """读取 CMUdict 格式的发音表：WORD  PH1 PH2 ...，# 开头为注释"""
+    global _pronunciations
+    if _pronunciations is None:
+        _pronunciations = {}
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip() and not line.startswith('#'):
+                    word, phonemes = line.split(None, 1)
+                    _pronunciations[word.lower()] = phonemes.split()
+    return _pronunciations
+
+
+def _vowel_groups(word):
+    """拼写中的元音字母组，用来给发音表里的元音配上拼写"""
+    if len(word) > 3 and re.search(r'[^aeiou]e$', word):
+        word = word[:-1]
+    return re.findall(r'[aeiou]+|(?<=[^aeiou])y', word)
+
+
+def from_table(word, arpabet):
+    """发音表条目 → [(音素, 重音, 拼写)]，元音个数与拼写对得上时才带拼写"""
+    phonemes = []
+    for symbol in arpabet:
+        stress = int(symbol[-1]) if symbol[-1].isdigit() else None
+        phonemes.append([symbol.rstrip('012'), stress, None])
+
+    vowels = [p for p in phonemes if p[0] in VOWELS]
+    groups = _vowel_groups(word)
+    if len(groups) == len(vowels):
+        for phoneme, letters in zip(vowels, groups):
+            phoneme[2] = letters
+    return [tuple(p) for p in phonemes]
+
+
+def from_spelling(word):
+    """按拼写规则推出音素，没有重音信息"""
+    phonemes = []
+    position = 0
+    while position < len(word):
+        for pattern, symbols in SPELLING_RULES:
+            match = pattern.match(word, position)
+            if match:
+                for symbol in symbols:
+                    symbol, _, letters = symbol.partition(':')
+                    phonemes.append((symbol, None, letters or match.group(0)))
+                position = match.end() if match.end() > position else position + 1
+                break
+        else:
+            position += 1
+    return phonemes
+
+
+def to_phonemes(word):
+    table = load_pronunciations()
+    if word in table:
+        return from_table(word, table[word])
+    if word.endswith('s') and word[:-1] in table:
+        return from_table(word[:-1], table[word[:-1]]) + [('Z', None, 's')]
+    return from_spelling(word)
+
+
+def _vowel_shape(symbol, stress, letters):
+    """元音 → (假名列, 后缀)"""
+    letter = (letters or '')[:1]
+    if symbol == 'AA':
+        return ('o' if letter == 'o' else 'a'), ''
+    if symbol == 'AH':
+        if stress == 1 or not letter:
+            return 'a', ''
+        return {'o': 'o', 'e': 'e', 'i': 'i'}.get(letter, 'a'), ''
+    if symbol == 'OW' and stress == 0:
+        return 'o', ''
+    return {
+        'AE': ('a', ''), 'AO': ('o', 'ー'), 'AW': ('a', 'ウ'), 'AY': ('a', 'イ'), 'EH': ('e', ''),
+        'ER': ('a', 'ー'), 'EY': ('e', 'ー'), 'IH': ('i', ''), 'IY': ('i', 'ー'), 'OW': ('o', 'ー'),
+        'OY': ('o', 'イ'), 'UH': ('u', ''), 'UW': ('u', 'ー'),
+    }[symbol]
+
+
+def _syllable(consonant, column):
+    index = COLUMNS.index(column)
+    if consonant in COMPOUND_SYLLABLES:
+        return COMPOUND_SYLLABLES[consonant][index]
+    return SYLLABLES[consonant][index]
+
+
+def _add_geminate(phonemes):
+    """词尾塞音前是短元音时加促音：cat → キャット"""
+    if len(phonemes) >= 2 and phonemes[-1][0] in GEMINATE_STOPS:
+        symbol, stress, _ = phonemes[-2]
+        if symbol in SHORT_VOWELS and stress != 0:
+            return phonemes[:-1] + [('Q', None, None), phonemes[-1]]
+    return phonemes
+
+
+def to_katakana(phonemes):
+    phonemes = _add_geminate(list(phonemes))
+    symbols = [p[0] for p in phonemes] + [None, None, None]
+    out = []
+
+    def append(kana):
+        if kana == 'ー' and (not out or out[-1].endswith('ー')):
+            return
+        out.append(kana)
+
+    i = 0
+    while i < len(phonemes):
+        symbol, stress, letters = phonemes[i]
+        following = symbols[i + 1]
+
+        if symbol == 'Q':
+            if out and following and following not in VOWELS and following != 'Q':
+                append('ッ')
+            i += 1
+            continue
+
+        if symbol in VOWELS:
+            column, suffix = _vowel_shape(symbol, stress, letters)
+            append(_syllable('', column))
+            if suffix:
+                append(suffix)
+            i += 1
+            continue
+
+        # 辅音 + y + 元音写成拗音：computer → ピュー
+        if following == 'Y' and symbols[i + 2] in VOWELS and symbol in SYLLABLES and symbol != 'R':
+            column, suffix = _vowel_shape(*phonemes[i + 2])
+            append(_syllable(symbol, 'i') + SMALL_GLIDES.get(column, ''))
+            if suffix:
+                append(suffix)
+            i += 3
+            continue
+
+        if following in VOWELS:
+            column, suffix = _vowel_shape(*phonemes[i + 1])
+            kana = _syllable(symbol, column)
+            # 闭音节里的 ka/ga 写成 キャ/ギャ：cat → キャット
+            if symbol in ('K', 'G') and following == 'AE' and symbols[i + 2] and symbols[i + 2] not in VOWELS \
+                    and symbols[i + 3] not in VOWELS:
+                kana = _syllable(symbol, 'i') + 'ャ'
+            append(kana)
+            if suffix:
+                append(suffix)
+            i += 2
+            continue
+
+        # 不接元音的辅音
+        if symbol == 'R':
+            append('ー' if out else 'ル')
+        elif symbol == 'T' and following == 'S':
+            append('ツ')
+            i += 1
+        elif symbol == 'M' and following in ('P', 'B', 'M'):
+            append('ン')
+        elif symbol == 'NG' and following in ('K', 'G'):
+            append('ン')
+        elif symbol == 'K' and following is None and i and phonemes[i - 1][0] in ('EY', 'IY'):
+            append('キ')
+        else:
+            append(CODAS.get(symbol, ''))
+        i += 1
+
+    return ''.join(out)
+
+
+def transliterate(text):
+    """英文单词或短语 → 片假名，多个单词直接连写"""
+    words = re.findall(r'[a-z]+', text.lower())
+    return ''.join(to_katakana(to_phonemes(word)) for word in words)
+
+
+if __name__ == '__main__':
+    import sys
+    for argument in sys.argv[1:]:
+        print(f"{argument}\t{transliterate(argument)}")
@@ -1,8 +1,26 @@
 # -*- coding: utf-8 -*-
 import sys
 import json
-import subprocess
 import os
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+from common import alfred, timing
+from common.frecency import UsageLog
+
+SLACK_API_URL = 'https://slack.com/api'
+SYNC_INTERVAL = 6 * 3600
+SYNC_LOCK_EXPIRY = 600
+SYNC_RERUN = 1.0
+SYNC_RETRY_DELAY = 300
+CACHE_DIR = os.getenv('alfred_workflow_data', os.path.expanduser('~/.alfred_workflow_data_slack'))
+INDEX_PATH = os.path.join(CACHE_DIR, 'channels.db')
+SYNC_LOCK_PATH = os.path.join(CACHE_DIR, 'sync.lock')
+SYNC_FAILED_PATH = os.path.join(CACHE_DIR, 'sync.failed')
+USAGE_LOG_PATH = os.path.join(CACHE_DIR, 'usage.json')
+
+class SlackAPIError(Exception):
+    """Raised when the Slack Web API returns ok=false"""
 
 def load_config():
     """Load configuration from .env file"""
@@ -23,6 +41,10 @@ def load_config():
                     command = command.strip()
                     value = value.strip()
                     
+                    # SLACK_* keys are workflow settings, not commands
+                    if command.startswith('SLACK_'):
+                        continue
+
                     if ',' in value:
                         team_id, channel_id = value.split(',', 1)
                         commands[command] = {
@@ -38,9 +60,29 @@ def load_config():
         print(f"Error reading config file: {e}", file=sys.stderr)
         return {}
 
-def open_slack_channel(team_id, channel_id):
-    """Open Slack channel"""
-    url = f"slack://channel?team={team_id}&id={channel_id}"
+def load_settings():
+    """Load SLACK_* settings from .env file, environment variables take precedence"""
+    env_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env')
+
+    settings = {}
+    if os.path.exists(env_path):
+        with open(env_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#') and '=' in line:
+                    key, value = line.split('=', 1)
+                    if key.strip().startswith('SLACK_'):
+                        settings[key.strip()] = value.strip()
+
+    for key, value in os.environ.items():
+        if key.startswith('SLACK_'):
+            settings[key] = value
+
+    return settings
+
+def open_slack_url(url):
+    """Open a slack:// URL"""
+    import subprocess
     try:
         subprocess.run(['open', url], check=True)
         return True
@@ -48,10 +90,327 @@ def open_slack_channel(team_id, channel_id):
         print(f"Failed to open Slack channel: {e}", file=sys.stderr)
         return False
 
-def generate_alfred_results(query, commands):
+def open_slack_channel(team_id, channel_id):
+    """Open Slack channel"""
+    return open_slack_url(f"slack://channel?team={team_id}&id={channel_id}")
+
+# --- Channel index ---
+
+def open_index(path=INDEX_PATH):
+    """Open (and create if needed) the local channel index"""
+    import sqlite3
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS channels (
+            id TEXT PRIMARY KEY,
+            team_id TEXT NOT NULL,
+            name TEXT NOT NULL,
+            topic TEXT NOT NULL DEFAULT '',
+            num_members INTEGER NOT NULL DEFAULT 0,
+            synced_at INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_channels_name ON channels (name COLLATE NOCASE);
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+    """)
+    return conn
+
+def get_meta(conn, key, default=None):
+    row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else default
+
+def set_meta(conn, key, value):
+    if value is None:
+        conn.execute("DELETE FROM meta WHERE key = ?", (key,))
+    else:
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+def slack_api(method, params, settings):
+    """Call a Slack Web API method, retrying on rate limits"""
+    import urllib.parse
+    import urllib.request
+    from urllib.error import HTTPError
+
+    api_url = settings.get('SLACK_API_URL', SLACK_API_URL).rstrip('/')
+    url = f"{api_url}/{method}?{urllib.parse.urlencode(params)}"
+    req = urllib.request.Request(url, headers={
+        'Authorization': f"Bearer {settings.get('SLACK_TOKEN', '')}"
+    })
+
+    for attempt in range(3):
+        try:
+            with urllib.request.urlopen(req, timeout=15) as response:
+                data = json.loads(response.read().decode('utf-8'))
+            break
+        except HTTPError as e:
+            if e.code == 429 and attempt < 2:
+                time.sleep(int(e.headers.get('Retry-After', '1')))
+                continue
+            raise
+
+    if not data.get('ok'):
+        raise SlackAPIError(data.get('error', 'unknown_error'))
+    return data
+
+def start_generation(conn):
+    """Start a new pass from the first page; channels not seen in it get an older synced_at"""
+    # 同一秒内开始的两轮同步也要分得开，否则上一轮的频道不会被当成没见到而删除
+    newest = conn.execute("SELECT MAX(synced_at) FROM channels").fetchone()[0] or 0
+    generation = max(int(time.time()), newest + 1)
+    set_meta(conn, 'sync_cursor', None)
+    set_meta(conn, 'sync_generation', generation)
+    conn.commit()
+    return generation
+
+def sync_channels(settings, conn):
+    """
+    Pull the channel list through conversations.list and upsert it into the index.
+
+    Every page is committed as it arrives and the cursor is persisted, so an
+    interrupted sync resumes where it stopped and the keystroke path sees
+    partial results. Channels not seen during a complete pass are removed.
+    A saved cursor that Slack no longer accepts restarts the pass from the
+    first page.
+    """
+    if not settings.get('SLACK_TOKEN'):
+        raise SlackAPIError('SLACK_TOKEN is not configured')
+
+    team_id = settings.get('SLACK_TEAM_ID') or slack_api('auth.test', {}, settings).get('team_id', '')
+
+    cursor = get_meta(conn, 'sync_cursor', '')
+    generation = int(get_meta(conn, 'sync_generation', 0) or 0)
+    if not cursor or not generation:
+        cursor = ''
+        generation = start_generation(conn)
+    resuming = bool(cursor)
+
+    synced = 0
+    while True:
+        params = {
+            'limit': 200,
+            'exclude_archived': 'true',
+            'types': settings.get('SLACK_CHANNEL_TYPES', 'public_channel,private_channel')
+        }
+        if cursor:
+            params['cursor'] = cursor
+        try:
+            data = slack_api('conversations.list', params, settings)
+        except SlackAPIError as e:
+            # 保存的 cursor 过期或失效时不能一直拿它重试，丢掉它从第一页重新开始一轮
+            if not resuming or str(e) != 'invalid_cursor':
+                raise
+            print("Saved sync cursor was rejected, restarting from the first page", file=sys.stderr)
+            resuming = False
+            cursor = ''
+            generation = start_generation(conn)
+            continue
+        resuming = False
+
+        rows = []
+        for channel in data.get('channels', []):
+            rows.append((
+                channel['id'],
+                channel.get('context_team_id') or team_id,
+                channel.get('name', ''),
+                (channel.get('topic') or {}).get('value', ''),
+                channel.get('num_members', 0),
+                generation
+            ))
+        conn.executemany("""
+            INSERT INTO channels (id, team_id, name, topic, num_members, synced_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(id) DO UPDATE SET
+                team_id = excluded.team_id, name = excluded.name, topic = excluded.topic,
+                num_members = excluded.num_members, synced_at = excluded.synced_at
+        """, rows)
+        synced += len(rows)
+
+        cursor = (data.get('response_metadata') or {}).get('next_cursor', '')
+        set_meta(conn, 'sync_cursor', cursor or None)
+        conn.commit()
+        if not cursor:
+            break
+
+    conn.execute("DELETE FROM channels WHERE synced_at < ?", (generation,))
+    set_meta(conn, 'sync_generation', None)
+    set_meta(conn, 'last_sync', int(time.time()))
+    conn.commit()
+    return synced
+
+def run_sync(settings):
+    """Run a sync guarded by a lock file so only one runs at a time"""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    try:
+        fd = os.open(SYNC_LOCK_PATH, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        if time.time() - os.path.getmtime(SYNC_LOCK_PATH) < SYNC_LOCK_EXPIRY:
+            print("Sync already in progress", file=sys.stderr)
+            return False
+        os.remove(SYNC_LOCK_PATH)
+        return run_sync(settings)
+
+    try:
+        os.write(fd, str(os.getpid()).encode())
+        os.close(fd)
+        conn = open_index()
+        try:
+            count = sync_channels(settings, conn)
+        finally:
+            conn.close()
+        print(f"Synced {count} Slack channels", file=sys.stderr)
+        if os.path.exists(SYNC_FAILED_PATH):
+            os.remove(SYNC_FAILED_PATH)
+        return True
+    except Exception as e:
+        print(f"Channel sync failed: {e}", file=sys.stderr)
+        # 记录失败时间，自动同步在 SYNC_RETRY_DELAY 内不再重试
+        with open(SYNC_FAILED_PATH, 'w') as f:
+            f.write(str(e))
+        return False
+    finally:
+        os.remove(SYNC_LOCK_PATH)
+
+def is_sync_running():
+    return os.path.exists(SYNC_LOCK_PATH) and time.time() - os.path.getmtime(SYNC_LOCK_PATH) < SYNC_LOCK_EXPIRY
+
+def start_background_sync():
+    """Spawn a detached sync process, the keystroke path never waits for it"""
+    if is_sync_running():
+        return True
+    import subprocess
+    subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), '--sync'],
+        stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        start_new_session=True
+    )
+    return True
+
+def match_score(terms, name, topic):
+    """Score a channel against the query terms, 0 means no match"""
+    name = name.lower()
+    topic = topic.lower()
+    words = name.replace('_', '-').replace('.', '-').split('-')
+
+    score = 0
+    for term in terms:
+        if name == term:
+            score += 100
+        elif name.startswith(term):
+            score += 80
+        elif any(word.startswith(term) for word in words):
+            score += 60
+        elif term in name:
+            score += 40
+        elif term in topic:
+            score += 10
+        else:
+            return 0
+    return score
+
+def channel_url(team_id, channel_id):
+    return f"slack://channel?team={team_id}&id={channel_id}"
+
+def used_channel_ids(usage):
+    """Channel ids in the usage log, whose keys are the channel URLs that were opened"""
+    if usage is None:
+        return []
+    return [key.rsplit('&id=', 1)[1] for key in usage.entries if key.startswith('slack://channel?') and '&id=' in key]
+
+def search_channels(query, conn, limit=50, usage=None):
+    """
+    Search the local index, returns (score, row) pairs ranked by match score then member count.
+
+    With a usage log the frecency boost is applied before truncating to limit,
+    so a small channel that is opened often is not cut off by bigger ones.
+    """
+    terms = query.lower().split()
+    if not terms:
+        rows = conn.execute(
+            "SELECT id, team_id, name, topic, num_members FROM channels ORDER BY num_members DESC LIMIT ?",
+            (limit,)
+        ).fetchall()
+        # 空查询只取成员最多的频道，常用频道要另外补进候选
+        used = used_channel_ids(usage)
+        if used:
+            rows += conn.execute(
+                f"SELECT id, team_id, name, topic, num_members FROM channels WHERE id IN ({', '.join('?' * len(used))})",
+                used
+            ).fetchall()
+        scored = [(1, row[4], row) for row in dict.fromkeys(rows)]
+    else:
+        # Narrow the candidates in SQL by the first term, rank the rest in Python
+        pattern = f"%{terms[0]}%"
+        rows = conn.execute(
+            "SELECT id, team_id, name, topic, num_members FROM channels WHERE name LIKE ? OR topic LIKE ?",
+            (pattern, pattern)
+        ).fetchall()
+
+        scored = []
+        for row in rows:
+            score = match_score(terms, row[2], row[3])
+            if score:
+                scored.append((score, row[4], row))
+    scored.sort(key=lambda x: (-x[0], -x[1], x[2][2]))
+    if usage is not None:
+        scored = usage.rank(scored, key=lambda c: channel_url(c[2][1], c[2][0]), match_score=lambda c: c[0])
+    return [(score, row) for score, _, row in scored[:limit]]
+
+def generate_channel_items(query, settings, usage=None):
+    """Generate (score, item) pairs from the local channel index, never touches the network
+    返回 (items, syncing)，syncing 表示后台同步正在进行"""
+    items = []
+    last_sync = 0
+
+    if os.path.exists(INDEX_PATH):
+        with timing.span('cache'):
+            conn = open_index()
+            try:
+                last_sync = int(get_meta(conn, 'last_sync', 0) or 0)
+                rows = search_channels(query, conn, usage=usage)
+            finally:
+                conn.close()
+
+        for score, (channel_id, team_id, name, topic, num_members) in rows:
+            subtitle = f"{num_members} members"
+            if topic:
+                subtitle = f"{topic} | {subtitle}"
+            items.append((score, {
+                'uid': channel_id,
+                'arg': channel_url(team_id, channel_id),
+                'title': f"#{name}",
+                'subtitle': subtitle,
+                'autocomplete': name
+            }))
+
+    interval = int(settings.get('SLACK_SYNC_INTERVAL', SYNC_INTERVAL))
+    recently_failed = os.path.exists(SYNC_FAILED_PATH) and time.time() - os.path.getmtime(SYNC_FAILED_PATH) < SYNC_RETRY_DELAY
+    if settings.get('SLACK_TOKEN') and time.time() - last_sync > interval and not recently_failed:
+        return items, start_background_sync()
+
+    return items, is_sync_running()
+
+def generate_alfred_results(query, commands, settings=None):
     """Generate Alfred Script Filter results"""
+    settings = settings or {}
     
     items = []
+
+    if query.startswith('--'):
+        if settings.get('SLACK_TOKEN'):
+            subtitle = "Sync is running in the background" if is_sync_running() else "Pull the full channel list from Slack"
+        else:
+            subtitle = "⚠️ Set SLACK_TOKEN in .env to enable channel sync"
+        items.append({
+            'arg': '--sync',
+            'title': 'Sync Slack channel directory',
+            'subtitle': subtitle,
+            'valid': bool(settings.get('SLACK_TOKEN'))
+        })
+        return alfred.script_filter(items)
     
     for command, config in commands.items():
         # Filter by query if provided
@@ -65,17 +424,34 @@ def generate_alfred_results(query, commands):
         if not team_id or not channel_id:
             subtitle = "⚠️ Missing team_id or channel_id in configuration"
             
-        items.append({
+        score = match_score([query.lower()], command, '') if query else 1
+        items.append((score, {
             'arg': command,
             'title': command,
             'subtitle': subtitle,
             'autocomplete': command
-        })
+        }))
     
-    return {'items': items}
+    usage = UsageLog(USAGE_LOG_PATH)
+    configured = {(c.get('team_id'), c.get('channel_id')) for c in commands.values()}
+    channel_items, syncing = generate_channel_items(query, settings, usage)
+    for score, item in channel_items:
+        team_id, channel_id = item['arg'].split('team=', 1)[1].split('&id=', 1)
+        if (team_id, channel_id) not in configured:
+            items.append((score, item))
+
+    # Boost what was actually opened recently and often
+    with timing.span('filter'):
+        ranked = usage.rank(items, key=lambda c: c[1]['arg'], match_score=lambda c: c[0])
+    # 后台同步进行中时让 Alfred 定时重跑，同步完成后新频道自动出现
+    rerun = SYNC_RERUN if syncing else None
+    return alfred.script_filter([item for _, item in ranked], rerun=rerun)
 
 def handle_command(command, commands):
     """Handle the selected command"""
+    if command.startswith('slack://'):
+        return open_slack_url(command)
+
     if command not in commands:
         print(f"Unknown command: {command}", file=sys.stderr)
         return False
@@ -94,20 +470,29 @@ def handle_command(command, commands):
 def main():
     """Main function"""
     # Load configuration
-    commands = load_config()
+    with timing.span('config'):
+        commands = load_config()
+        settings = load_settings()
     
     if len(sys.argv) > 1:
         # Command execution mode
         command = sys.argv[1]
-        success = handle_command(command, commands)
+        if command == '--sync':
+            success = run_sync(settings)
+        else:
+            success = handle_command(command, commands)
+            if success:
+                UsageLog(USAGE_LOG_PATH).record(command)
         if not success:
             print(f"Failed to execute command: {command}", file=sys.stderr)
             sys.exit(1)
     else:
         # Alfred Script Filter mode
         query = os.environ.get('query', '').strip()
-        results = generate_alfred_results(query, commands)
-        print(json.dumps(results, ensure_ascii=False, indent=2))
+        results = generate_alfred_results(query, commands, settings)
+        with timing.span('render'):
+            print(json.dumps(results, ensure_ascii=False, indent=2))
+        timing.flush(CACHE_DIR, 'slack', query)
 
 if __name__ == '__main__':
     main()